@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+'''Measure the cold start time of gtimecalc-cli.
+
+The CLI is run with a single equation on standard input, and the
+wall time is compared with a bare "python -c pass". The script also
+checks that the CLI doesn't import gi.
+
+Usage: bench_cli_startup.py [RUNS]
+'''
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+BIN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'bin', 'gtimecalc-cli'))
+
+
+def measure(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            args, input=b'01:00:00 + 00:30:00\n',
+            stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    proc = subprocess.run(
+        (sys.executable, '-X', 'importtime', BIN_PATH),
+        input=b'1 + 1\n', stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        check=True)
+    imported = [
+        line.rsplit('|', 1)[-1].strip()
+        for line in proc.stderr.decode().splitlines()]
+    if any(name == 'gi' or name.startswith('gi.') for name in imported):
+        sys.exit('gtimecalc-cli imports gi')
+
+    for name, args in (
+            ('python -c pass', (sys.executable, '-c', 'pass')),
+            ('gtimecalc-cli', (sys.executable, BIN_PATH))):
+        times = measure(args, runs)
+        print('{}: min {:.1f} ms, median {:.1f} ms'.format(
+            name, min(times) * 1000, statistics.median(times) * 1000))
+
+
+if __name__ == '__main__':
+    main()
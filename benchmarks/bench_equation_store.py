@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+'''Compare EquationStore with a GtkListStore of four object columns.
+
+For every kind of store, a child process fills it with random
+equations and reports the time of filling, the time of reading all
+values through the TreeModel API, and the growth of the resident set
+size. Running each store in its own process keeps the memory figures
+independent.
+
+Usage: bench_equation_store.py [--rows N]
+'''
+
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+STORES = ('list-store', 'equation-store')
+
+
+def make_store(kind):
+    from gtimecalc import gi_versions  # Must be imported before gi.repository
+    from gi.repository import Gtk, GObject
+
+    if kind == 'list-store':
+        return Gtk.ListStore(*(GObject.TYPE_PYOBJECT, ) * 4)
+
+    from gtimecalc.notebook.equation_list import EquationStore
+    return EquationStore()
+
+
+def get_rss_kb():
+    # ru_maxrss only grows, but nothing is freed during the benchmark
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_child(kind, num_rows):
+    store = make_store(kind)
+
+    rnd = random.Random(0)
+    rows = []
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        rows.append((time1, time2, operation, result))
+
+    rss_before = get_rss_kb()
+
+    start = time.perf_counter()
+    for row in rows:
+        store.append(row)
+    fill_time = time.perf_counter() - start
+
+    del rows
+    rss_after = get_rss_kb()
+
+    start = time.perf_counter()
+    get_value = store.get_value
+    tree_iter = store.get_iter_first()
+    while tree_iter is not None:
+        for column in range(4):
+            get_value(tree_iter, column)
+        tree_iter = store.iter_next(tree_iter)
+    read_time = time.perf_counter() - start
+
+    print('{:<16} fill {:8.1f} ms  read {:8.1f} ms  '
+          'memory {:8.1f} MiB ({:.0f} bytes/row)'.format(
+              kind,
+              fill_time * 1000,
+              read_time * 1000,
+              (rss_after - rss_before) / 1024,
+              (rss_after - rss_before) * 1024 / max(num_rows, 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--child', choices=STORES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.rows)
+        return
+
+    for kind in STORES:
+        sys.stdout.flush()
+        subprocess.check_call((
+            sys.executable, __file__,
+            '--child', kind, '--rows', str(args.rows)))
+
+
+if __name__ == '__main__':
+    main()
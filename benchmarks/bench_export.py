@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+'''Measure formatting equations for export.
+
+Formats 1M equations with the old per-row scan of the format string
+(a dict of replacements and str.find() for every equation) and with
+exporting.Template, which compiles the format string once. Times are
+formatted beforehand, both as rows and as columns, so only the
+application of the format string is measured.
+
+Usage: bench_export.py [--rows N] [--format FORMAT]
+'''
+
+import argparse
+from itertools import chain
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc.notebook.exporting import Template
+from gtimecalc.time_tools import ms_to_str_many
+
+
+FORMAT_SPECIFIERS = ('1', '2', 'o', 'r', 'n', 't', '%')
+
+
+def old_format(s, replacements):
+    result = ''
+
+    copy_start = 0
+    search_start = 0
+    while True:
+        idx = s.find('%', search_start, -1)
+        if idx == -1:
+            result += s[copy_start:]
+            break
+
+        search_start = idx + 2
+
+        replacement = replacements.get(s[idx + 1])
+        if replacement is None:
+            continue
+
+        if copy_start != idx:
+            result += s[copy_start:idx]
+
+        result += replacement
+        copy_start = search_start
+
+    return result
+
+
+def format_old(format_string, eqs, columns):
+    lines = []
+    for eq in eqs:
+        replacements = dict(
+            zip(FORMAT_SPECIFIERS, chain(eq, ('\n', '\t', '%'))))
+        lines.append(old_format(format_string, replacements))
+    return '\n'.join(lines)
+
+
+def format_template(format_string, eqs, columns):
+    template = Template(format_string)
+    return '\n'.join(template.format_columns(columns, len(eqs)))
+
+
+def make_eqs(num_rows):
+    rnd = random.Random(0)
+    time1 = [rnd.randrange(100 * 3600000) for _ in range(num_rows)]
+    time2 = [rnd.randrange(100 * 3600000) for _ in range(num_rows)]
+    operations = [rnd.randrange(2) for _ in range(num_rows)]
+    results = [
+        t1 - t2 if operation else t1 + t2
+        for t1, t2, operation in zip(time1, time2, operations)]
+    return list(zip(
+        ms_to_str_many(time1),
+        ms_to_str_many(time2),
+        (('+', '-')[operation] for operation in operations),
+        ms_to_str_many(results)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--format', default='%1 %o %2 = %r')
+    args = parser.parse_args()
+
+    eqs = make_eqs(args.rows)
+    columns = list(zip(*eqs))
+
+    results = []
+    for name, func in (
+            ('per-row scan', format_old),
+            ('template', format_template)):
+        start = time.perf_counter()
+        results.append(func(args.format, eqs, columns))
+        print('{:<16} {:10.1f} ms'.format(
+            name, (time.perf_counter() - start) * 1000))
+
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
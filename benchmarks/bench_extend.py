@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''Measure inserting many rows into an EquationStore shown in a view.
+
+Compares appending rows one by one, EquationStore.extend() with the
+view attached, and extend() with the model detached from the view,
+like Notebook does for bulk changes. The time includes attaching the
+model back, which makes the view rebuild its rows.
+
+Usage: bench_extend.py [--rows N] [--repeat N]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc import gi_versions  # Must be imported before gi.repository
+from gi.repository import Gtk
+
+from gtimecalc.notebook.equation_list import EquationStore, EquationList
+
+
+def make_rows(num_rows):
+    rnd = random.Random(0)
+    rows = []
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        rows.append((time1, time2, operation, result))
+    return rows
+
+
+def insert_append(eq_list, store, rows):
+    for row in rows:
+        store.append(row)
+
+
+def insert_extend(eq_list, store, rows):
+    store.extend(rows)
+
+
+def insert_extend_detached(eq_list, store, rows):
+    eq_list.set_model(None)
+    try:
+        store.extend(rows)
+    finally:
+        eq_list.set_model(store)
+
+
+METHODS = (
+    ('append', insert_append),
+    ('extend', insert_extend),
+    ('extend, detached', insert_extend_detached),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    for name, insert in METHODS:
+        best = float('inf')
+        for _ in range(args.repeat):
+            store = EquationStore()
+            eq_list = EquationList(store)
+            window = Gtk.Window(default_width=600, default_height=800)
+            scrolled = Gtk.ScrolledWindow()
+            scrolled.add(eq_list)
+            window.add(scrolled)
+            window.show_all()
+
+            start = time.perf_counter()
+            insert(eq_list, store, rows)
+            best = min(best, time.perf_counter() - start)
+
+            window.destroy()
+
+        print('{:<20} {:10.1f} ms'.format(name, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
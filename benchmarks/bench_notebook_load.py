@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+'''Compare loading a notebook from JSON and from the binary format.
+
+The notebook is filled with random equations and saved in both
+formats. Every format is then loaded in a child process, which reports
+the load time and the growth of the peak resident set size.
+
+Usage: bench_notebook_load.py [--rows N]
+'''
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc.notebook import storage
+
+
+FORMATS = {
+    'json': storage.load_json,
+    'binary': lambda path: storage.load(path)[0],
+    }
+
+
+def make_columns(num_rows):
+    rnd = random.Random(0)
+    columns = storage.new_columns()
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        storage.append_row(columns, (time1, time2, operation, result))
+    return columns
+
+
+def get_max_rss_kb():
+    # ru_maxrss of a child survives exec, so it would report the peak
+    # of the parent that created the files; VmHWM is reset by exec
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_child(fmt, path):
+    rss_before = get_max_rss_kb()
+    start = time.perf_counter()
+    columns = FORMATS[fmt](path)
+    load_time = time.perf_counter() - start
+    rss_after = get_max_rss_kb()
+
+    print('{:<8} {:>9} rows  file {:7.1f} MiB  load {:8.1f} ms  '
+          'peak memory +{:.1f} MiB'.format(
+              fmt,
+              len(columns[0]),
+              os.path.getsize(path) / 2 ** 20,
+              load_time * 1000,
+              (rss_after - rss_before) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        columns = make_columns(args.rows)
+        paths = {
+            'json': os.path.join(tmp_dir, 'notebook.json'),
+            'binary': os.path.join(tmp_dir, 'notebook'),
+            }
+        storage.save_json(paths['json'], columns)
+        storage.save(paths['binary'], columns)
+        del columns
+
+        for fmt, path in paths.items():
+            sys.stdout.flush()
+            subprocess.check_call(
+                (sys.executable, __file__, '--child', fmt, path))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
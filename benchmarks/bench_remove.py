@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+'''Compare the strategies of bulk removal from EquationStore columns.
+
+For several selections, the rows are removed from 1M-row columns by
+deleting coalesced ranges one by one and by rebuilding the columns.
+columns.delete_rows() switches between the two at
+columns.REBUILD_MIN_RANGES ranges.
+
+Usage: bench_remove.py [--rows N] [--selected N]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc.notebook import columns, storage
+
+
+def make_columns(num_rows):
+    rnd = random.Random(0)
+    result = storage.new_columns()
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result_time = time1 - time2 if operation else time1 + time2
+        storage.append_row(
+            result, (time1, time2, operation, result_time))
+    return result
+
+
+def make_selections(num_rows, num_selected):
+    rnd = random.Random(1)
+    selections = []
+
+    for num_blocks in (1, 2, 4, 8, 64, 1024):
+        block_size = num_selected // num_blocks
+        step = num_rows // num_blocks
+        selections.append((
+            '{} block(s)'.format(num_blocks),
+            [i for block in range(num_blocks)
+             for i in range(block * step, block * step + block_size)]))
+
+    selections.append((
+        'random',
+        sorted(rnd.sample(range(num_rows), num_selected))))
+
+    return selections
+
+
+def measure(func, data, ranges):
+    data = [values[:] for values in data]
+    start = time.perf_counter()
+    func(data, ranges)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--selected', type=int, default=200000)
+    args = parser.parse_args()
+
+    data = make_columns(args.rows)
+    print('{:<16} {:>8} {:>12} {:>12}'.format(
+        'selection', 'ranges', 'ranges, ms', 'rebuild, ms'))
+    for name, indices in make_selections(args.rows, args.selected):
+        ranges = columns.index_ranges(indices)
+        print('{:<16} {:>8} {:>12.1f} {:>12.1f}'.format(
+            name,
+            len(ranges),
+            measure(columns.delete_ranges, data, ranges) * 1000,
+            measure(columns.rebuild_without, data, ranges) * 1000))
+
+
+if __name__ == '__main__':
+    main()
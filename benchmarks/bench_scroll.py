@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+'''Measure frame time while scrolling the equation list.
+
+The list is filled with random equations and smoothly scrolled by an
+eighth of a page per frame, so most of the visible rows are redrawn on
+every frame. The script reports the time spent in drawing the list and
+the hit/miss counters of the display string cache.
+
+With --list-store, the equations are kept in a GtkListStore of four
+object columns (as the notebook did before EquationStore) to compare
+the two models.
+
+Usage: bench_scroll.py [--rows N] [--frames N] [--no-cache] [--list-store]
+
+Requires a display.
+'''
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc import gi_versions  # Must be imported before gi.repository
+from gi.repository import Gtk, GObject
+
+from gtimecalc.time_tools import ms_to_str
+from gtimecalc.notebook import equation_list
+from gtimecalc.notebook.equation_list import EquationStore, EquationList
+
+
+def fill_store(store, num_rows):
+    rnd = random.Random(0)
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        store.append((time1, time2, operation, result))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='format every cell with ms_to_str() directly')
+    parser.add_argument(
+        '--list-store', action='store_true',
+        help='use a GtkListStore instead of EquationStore')
+    args = parser.parse_args()
+
+    if args.no_cache:
+        equation_list.format_time = lambda ms: ms_to_str(ms, True)
+
+    if args.list_store:
+        store = Gtk.ListStore(*(GObject.TYPE_PYOBJECT, ) * 4)
+    else:
+        store = EquationStore()
+    fill_store(store, args.rows)
+
+    eq_list = EquationList(store)
+    scrolled = Gtk.ScrolledWindow()
+    scrolled.add(eq_list)
+
+    window = Gtk.Window(default_width=600, default_height=800)
+    window.add(scrolled)
+
+    draw_times = []
+    draw_start = 0.0
+
+    def on_draw_begin(widget, cr):
+        nonlocal draw_start
+        draw_start = time.perf_counter()
+
+    def on_draw_end(widget, cr):
+        draw_times.append(time.perf_counter() - draw_start)
+
+    eq_list.connect('draw', on_draw_begin)
+    eq_list.connect_after('draw', on_draw_end)
+
+    frames_left = args.frames
+
+    def on_tick(widget, frame_clock):
+        nonlocal frames_left
+        vadj = scrolled.get_vadjustment()
+        value = vadj.get_value() + vadj.get_page_size() / 8
+        if value >= vadj.get_upper() - vadj.get_page_size():
+            value = 0
+        vadj.set_value(value)
+
+        frames_left -= 1
+        if frames_left <= 0:
+            Gtk.main_quit()
+            return False
+        return True
+
+    window.connect('destroy', Gtk.main_quit)
+    window.show_all()
+    eq_list.add_tick_callback(on_tick)
+    Gtk.main()
+
+    print('frames: {}'.format(len(draw_times)))
+    if draw_times:
+        print(
+            'draw time: mean {:.2f} ms, median {:.2f} ms, '
+            'max {:.2f} ms'.format(
+                statistics.mean(draw_times) * 1000,
+                statistics.median(draw_times) * 1000,
+                max(draw_times) * 1000))
+    if not args.no_cache:
+        print(equation_list.format_time.cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+'''Measure sorting an EquationStore shown in a view.
+
+Every column is sorted ascending, then descending, and then the store
+is brought back to the order of insertion, like by clicking the
+column header three times. Sorting a column for the first time
+includes computing its order; reversing it uses the cached one.
+A Gtk.TreeModelSort with a Python sort function is measured for
+comparison, unless --no-model-sort is given.
+
+Usage: bench_sort.py [--rows N] [--no-model-sort]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc import gi_versions  # Must be imported before gi.repository
+from gi.repository import Gtk
+
+from gtimecalc.notebook.equation_list import EquationStore, EquationList
+
+
+COLUMNS = (
+    ('time 1', EquationStore.COL_TIME1),
+    ('time 2', EquationStore.COL_TIME2),
+    ('result', EquationStore.COL_RESULT),
+    )
+
+
+def make_columns(num_rows):
+    rnd = random.Random(0)
+    rows = []
+    for _ in range(num_rows):
+        time1 = rnd.randrange(100 * 3600000)
+        time2 = rnd.randrange(100 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        rows.append((time1, time2, operation, result))
+    return list(zip(*rows))
+
+
+def show(eq_list):
+    window = Gtk.Window(default_width=600, default_height=800)
+    scrolled = Gtk.ScrolledWindow()
+    scrolled.add(eq_list)
+    window.add(scrolled)
+    window.show_all()
+    return window
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    while Gtk.events_pending():
+        Gtk.main_iteration()
+    return time.perf_counter() - start
+
+
+def bench_store(columns):
+    store = EquationStore()
+    store.extend_columns(columns)
+    eq_list = EquationList(store)
+    window = show(eq_list)
+
+    for name, column in COLUMNS:
+        for order_name, column_id, order in (
+                ('ascending', column, Gtk.SortType.ASCENDING),
+                ('descending', column, Gtk.SortType.DESCENDING),
+                ('unsorted',
+                 Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID,
+                 Gtk.SortType.ASCENDING)):
+            print('{:<20} {:10.1f} ms'.format(
+                '{}, {}'.format(name, order_name),
+                measure(store.set_sort_column_id, column_id, order) * 1000))
+
+    window.destroy()
+
+
+def bench_model_sort(columns):
+    store = EquationStore()
+    store.extend_columns(columns)
+    model_sort = Gtk.TreeModelSort(model=store)
+    eq_list = EquationList(store)
+    eq_list.set_model(model_sort)
+    window = show(eq_list)
+
+    def compare(model, a, b, column):
+        a = model.get_value(a, column)
+        b = model.get_value(b, column)
+        return (a > b) - (a < b)
+
+    for name, column in COLUMNS:
+        model_sort.set_sort_func(column, compare, column)
+        print('{:<20} {:10.1f} ms'.format(
+            'TreeModelSort, {}'.format(name),
+            measure(
+                model_sort.set_sort_column_id,
+                column,
+                Gtk.SortType.ASCENDING) * 1000))
+
+    window.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--no-model-sort', action='store_true')
+    args = parser.parse_args()
+
+    columns = make_columns(args.rows)
+    bench_store(columns)
+    if not args.no_model_sort:
+        bench_model_sort(columns)
+
+
+if __name__ == '__main__':
+    main()
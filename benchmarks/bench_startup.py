@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+'''Measure the startup time of gTimeCalc.
+
+The script reports:
+
+* The import time of every gtimecalc module and of gi, as given by
+  "python -X importtime".
+* The time from the process start to the first MainWindow.show()
+  and to the first drawn frame.
+
+The application is started with a temporary XDG_CONFIG_HOME, so the
+user's settings are neither read nor modified. Pass --config-dir to
+start with a prepared configuration instead (for example, with the
+equation list shown and a big notebook).
+
+Usage: bench_startup.py [--runs N] [--config-dir DIR]
+
+Requires a display.
+'''
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD_CODE = r'''
+import sys
+import time
+
+sys.path.insert(1, {root_dir!r})
+
+from gtimecalc import gi_versions
+from gi.repository import GLib
+
+from gtimecalc import main_window
+from gtimecalc.gtimecalc import TimeCalc
+
+
+def show(self):
+    print('show', time.time(), flush=True)
+    self.connect('draw', on_draw)
+    show_orig(self)
+
+
+def on_draw(window, cr):
+    print('draw', time.time(), flush=True)
+    window.disconnect_by_func(on_draw)
+    GLib.idle_add(app.quit)
+
+
+show_orig = main_window.MainWindow.show
+main_window.MainWindow.show = show
+
+app = TimeCalc()
+app.run([])
+'''
+
+
+def print_import_times(env):
+    proc = subprocess.run(
+        (sys.executable, '-X', 'importtime', '-c',
+         'import sys; sys.path.insert(1, {!r});'
+         'import gtimecalc.gi_versions, gtimecalc.gtimecalc'.format(
+             ROOT_DIR)),
+        env=env, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True)
+
+    print('Import time (self / cumulative, ms):')
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[12:].split('|')
+        name = name.strip()
+        if name.startswith('gtimecalc') or name in ('gi', 'gi.repository'):
+            print('  {:<40} {:8.1f} {:8.1f}'.format(
+                name, int(self_us) / 1000, int(cumulative_us) / 1000))
+
+
+def measure_startup(env):
+    start = time.time()
+    proc = subprocess.run(
+        (sys.executable, '-c', CHILD_CODE.format(root_dir=ROOT_DIR)),
+        env=env, stdout=subprocess.PIPE, universal_newlines=True,
+        check=True)
+
+    times = {}
+    for line in proc.stdout.splitlines():
+        name, timestamp = line.split()
+        times.setdefault(name, float(timestamp) - start)
+    return times['show'], times['draw']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument(
+        '--config-dir',
+        help='copy this directory to the temporary XDG_CONFIG_HOME')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, XDG_CONFIG_HOME=tmp_dir)
+
+        print_import_times(env)
+
+        show_times = []
+        draw_times = []
+        for _ in range(args.runs):
+            app_config_dir = os.path.join(tmp_dir, 'gtimecalc')
+            shutil.rmtree(app_config_dir, ignore_errors=True)
+            if args.config_dir:
+                shutil.copytree(args.config_dir, app_config_dir)
+
+            show_time, draw_time = measure_startup(env)
+            show_times.append(show_time)
+            draw_times.append(draw_time)
+
+    print('First show(): median {:.1f} ms'.format(
+        statistics.median(show_times) * 1000))
+    print('First frame: median {:.1f} ms'.format(
+        statistics.median(draw_times) * 1000))
+
+
+if __name__ == '__main__':
+    main()
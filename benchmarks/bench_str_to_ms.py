@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+'''Compare str_to_ms() with the old translate-and-split parser.
+
+Usage: bench_str_to_ms.py [NUM_STRINGS]
+'''
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc import time_tools
+
+
+_TIME_STR_TRANS = str.maketrans('\N{MINUS SIGN}\N{RATIO},', '-::')
+
+
+def old_str_to_ms(time_str):
+    time_str = time_str.translate(_TIME_STR_TRANS)
+
+    parts = []
+    for s in time_str.split(':'):
+        parts.extend(s.split() or ('',))
+
+    result = 0
+    for val, ms, val_t in zip(
+            reversed(parts),
+            (time_tools.SECOND_MS, time_tools.MINUTE_MS, time_tools.HOUR_MS),
+            (float, int, int)):
+        if val:
+            result += round(val_t(val) * ms)
+    return result
+
+
+def make_strings(num):
+    rnd = random.Random(0)
+    templates = (
+        '{h:02}:{m:02}:{s:02}.{ms:03}',
+        '{h}\N{RATIO}{m:02}\N{RATIO}{s:02}.{ms:03}',
+        '\N{MINUS SIGN}{h:02}:{m:02}:{s:02}.{ms:03}',
+        '{m}:{s:02}',
+        '{h} {m} {s}.{ms}',
+        '{s}',
+        '{h}:',
+        '.{ms:03}',
+        )
+    return [
+        rnd.choice(templates).format(
+            h=rnd.randrange(100),
+            m=rnd.randrange(60),
+            s=rnd.randrange(60),
+            ms=rnd.randrange(1000))
+        for _ in range(num)]
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    strings = make_strings(num)
+
+    if list(map(old_str_to_ms, strings)) != time_tools.str_to_ms_many(strings):
+        sys.exit('Results differ')
+
+    results = {}
+    for name, func in (
+            ('old', old_str_to_ms),
+            ('new', time_tools.str_to_ms)):
+        results[name] = min(timeit.repeat(
+            lambda: list(map(func, strings)), number=1, repeat=3))
+        print('{}: {:.3f} s'.format(name, results[name]))
+
+    print('speedup: {:.2f}x'.format(results['old'] / results['new']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+'''Performance benchmark suite with regression thresholds.
+
+Every benchmark runs a fixed workload several times, and the best time
+is taken. With --save, the results are written to the baseline file.
+Otherwise, they are compared with the baseline, and the script exits
+with status 1 if any benchmark is slower than its baseline by more
+than the threshold.
+
+The baseline depends on the machine, so it's not under version
+control; save one before making changes, then compare after.
+
+Usage: run_benchmarks.py [--save] [--baseline FILE] [--threshold PCT]
+                         [--repeat N] [BENCHMARK ...]
+'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    1, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gtimecalc import time_tools
+from gtimecalc.notebook import exporting
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+NUM_VALUES = 100000
+
+_rnd = random.Random(0)
+
+TIMES = [_rnd.randrange(-100 * 3600000, 100 * 3600000)
+         for _ in range(NUM_VALUES)]
+
+UNITS = [time_tools.split_units(t) for t in TIMES]
+
+_STR_TEMPLATES = (
+    '{h:02}:{m:02}:{s:02}.{ms:03}',
+    '{h}\N{RATIO}{m:02}\N{RATIO}{s:02}.{ms:03}',
+    '\N{MINUS SIGN}{h:02}:{m:02}:{s:02}.{ms:03}',
+    '{m}:{s:02}',
+    '{h} {m} {s}.{ms}',
+    '{s}',
+    '{h}:',
+    '.{ms:03}',
+    )
+
+TIME_STRS = [
+    _rnd.choice(_STR_TEMPLATES).format(
+        h=_rnd.randrange(100),
+        m=_rnd.randrange(60),
+        s=_rnd.randrange(60),
+        ms=_rnd.randrange(1000))
+    for _ in range(NUM_VALUES)]
+
+
+def bench_join_units():
+    join_units = time_tools.join_units
+    for units in UNITS:
+        join_units(*units)
+
+
+def bench_split_units():
+    split_units = time_tools.split_units
+    for t in TIMES:
+        split_units(t)
+
+
+def bench_ms_to_str():
+    ms_to_str = time_tools.ms_to_str
+    for t in TIMES:
+        ms_to_str(t)
+
+
+def bench_ms_to_str_unicode():
+    ms_to_str = time_tools.ms_to_str
+    for t in TIMES:
+        ms_to_str(t, True)
+
+
+def bench_str_to_ms():
+    str_to_ms = time_tools.str_to_ms
+    for s in TIME_STRS:
+        str_to_ms(s)
+
+
+def _make_export_columns():
+    columns = ([], [], [], [])
+    for time1, time2 in zip(TIMES, reversed(TIMES)):
+        time1 = abs(time1)
+        time2 = abs(time2)
+        operation = time1 % 2
+        result = time1 - time2 if operation else time1 + time2
+        for values, value in zip(
+                columns,
+                (time_tools.ms_to_str(time1),
+                 time_tools.ms_to_str(time2),
+                 ('+', '-')[operation],
+                 time_tools.ms_to_str(result))):
+            values.append(value)
+    return columns
+
+
+EXPORT_COLUMNS = _make_export_columns()
+
+
+def bench_export_format():
+    template = exporting.Template('%1 %o %2 = %r')
+    for _ in template.format_columns(EXPORT_COLUMNS, NUM_VALUES):
+        pass
+
+
+BENCHMARKS = {
+    'join_units': bench_join_units,
+    'split_units': bench_split_units,
+    'ms_to_str': bench_ms_to_str,
+    'ms_to_str_unicode': bench_ms_to_str_unicode,
+    'str_to_ms': bench_str_to_ms,
+    'export_format': bench_export_format,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'benchmarks', nargs='*', metavar='BENCHMARK',
+        help='benchmarks to run (default: all): {}'.format(
+            ', '.join(BENCHMARKS)))
+    parser.add_argument(
+        '--save', action='store_true',
+        help='save the results as the new baseline')
+    parser.add_argument(
+        '--baseline', default=DEFAULT_BASELINE,
+        help='baseline file (default: %(default)s)')
+    parser.add_argument(
+        '--threshold', type=float, default=10.0,
+        help='allowed slowdown in percent (default: %(default)s)')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='number of runs of each benchmark (default: %(default)s)')
+    args = parser.parse_args()
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    baseline = {}
+    if not args.save:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print('No baseline; run with --save to create one',
+                  file=sys.stderr)
+
+    results = {}
+    regressions = []
+    for name in names:
+        result = min(timeit.repeat(
+            BENCHMARKS[name], number=1, repeat=args.repeat))
+        results[name] = result
+
+        line = '{:<20} {:8.2f} ms'.format(name, result * 1000)
+        if name in baseline:
+            change = (result / baseline[name] - 1) * 100
+            line += '  {:+7.1f}%'.format(change)
+            if change > args.threshold:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        baseline = {}
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError):
+            pass
+        baseline.update(results)
+
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print('Baseline saved to {}'.format(args.baseline))
+
+    if regressions:
+        print('{} benchmark(s) regressed by more than {}%: {}'.format(
+            len(regressions), args.threshold, ', '.join(regressions)),
+            file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -71,7 +71,8 @@ sed \
 
 
 chmod -R u+rwX,go+rX,go-w $BUILD_DIR
-chmod +x $DEB_DIR/postinst $DEB_DIR/prerm $BUILD_DIR/usr/bin/$APPNAME
+chmod +x $DEB_DIR/postinst $DEB_DIR/prerm \
+  $BUILD_DIR/usr/bin/$APPNAME $BUILD_DIR/usr/bin/$APPNAME-cli
 
 
 fakeroot dpkg-deb --build $BUILD_DIR .
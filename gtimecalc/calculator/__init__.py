@@ -1,3 +1,12 @@
+from .operation import Operation, calculate
 
-from .calculator import Calculator
-from .operation import Operation
+
+def __getattr__(name):
+    # Calculator is a Gtk widget, so it's only imported on demand to
+    # keep operation and expression evaluation usable without gi.
+    if name == 'Calculator':
+        from .calculator import Calculator
+        return Calculator
+
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
@@ -7,7 +7,8 @@ from ..common import WIDGET_SPACING
 from ..settings import settings
 from ..time_tools import ms_to_str, str_to_ms
 from .time_control import TimeControl
-from .operation import Operation, OperationChooser
+from .operation import Operation, calculate
+from .operation_chooser import OperationChooser
 from .result import Result
 
 
@@ -55,12 +56,7 @@ class Calculator(Gtk.Grid):
         self.time1, self.time2 = self.time2, self.time1
 
     def _calc_time(self, *args):
-        if self.operation == Operation.ADD:
-            result = self.time1 + self.time2
-        else:
-            result = self.time1 - self.time2
-
-        self._result.time = result
+        self._result.time = calculate(self.time1, self.operation, self.time2)
 
     @property
     def time1(self):
@@ -0,0 +1,277 @@
+'''Time expressions.
+
+An expression combines times, numbers, and variables with +, -, *, /,
+and parentheses, for example "01:30:00 + 45:00 - 00:00:12.5 * 3".
+
+* A time is a string in the str_to_ms() format that contains at least
+  one colon or RATIO; whitespace and commas are not allowed in times
+  inside expressions. Use a leading colon for plain seconds: ":30".
+* A number is a decimal number without separators, like 3 or 2.5.
+  When a number is added to or subtracted from a time, it's treated
+  as seconds.
+* A variable is an identifier that gets a time in milliseconds when
+  the expression is evaluated.
+
+Times can be multiplied and divided by numbers; dividing a time by
+a time gives a number. Arithmetic is exact; the final time is rounded
+to the nearest integer.
+
+Compiled expressions are cached, so evaluating the same expression
+with different variables doesn't parse it again.
+'''
+
+from fractions import Fraction
+from functools import lru_cache
+import operator
+import re
+
+from ..time_tools import Precision, str_to_ms
+
+
+_TOKEN_RE = re.compile(
+    r'''
+    \s*(?:
+        (?P<time>[\d.]*[:\N{RATIO}][\d.:\N{RATIO}]*)
+        |(?P<number>\d+\.?\d*|\.\d+)
+        |(?P<name>[^\W\d]\w*)
+        # MINUS SIGN, MULTIPLICATION SIGN, and DIVISION SIGN
+        |(?P<op>[-+*/()\u2212\u00d7\u00f7])
+    )''',
+    re.VERBOSE)
+
+_OPERATORS = {
+    '+': '+',
+    '-': '-',
+    '\N{MINUS SIGN}': '-',
+    '*': '*',
+    '\N{MULTIPLICATION SIGN}': '*',
+    '/': '/',
+    '\N{DIVISION SIGN}': '/',
+    '(': '(',
+    ')': ')',
+    }
+
+# Value types, known at compile time
+_TIME = 'time'
+_NUMBER = 'number'
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ValueError(
+                'Unexpected character at position {}: {!r}'.format(
+                    pos + 1, text[pos]))
+
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'op':
+            value = _OPERATORS[value]
+        tokens.append((kind, value, match.start(kind)))
+        pos = match.end()
+
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+
+def _binary(op, left, right):
+    return lambda values: op(left(values), right(values))
+
+
+def _divide(a, b):
+    try:
+        return Fraction(a) / b
+    except ZeroDivisionError:
+        raise ValueError('Division by zero') from None
+
+
+class _Parser:
+    '''Recursive descent parser that builds a tree of closures.
+
+    Every parse method returns a (type, func) tuple, where func takes
+    the dictionary of variables and returns the value.
+    '''
+
+    def __init__(self, text, precision):
+        self._tokens = _tokenize(text)
+        self._pos = 0
+        self._second = 10 ** precision
+        self._precision = precision
+        self.variables = set()
+
+    def _peek(self):
+        return self._tokens[self._pos]
+
+    def _next(self):
+        token = self._tokens[self._pos]
+        self._pos += 1
+        return token
+
+    def _error(self, message, token):
+        return ValueError('{} at position {}'.format(message, token[2] + 1))
+
+    def parse(self):
+        result = self._parse_sum()
+        token = self._peek()
+        if token[0] != 'end':
+            raise self._error('Unexpected {!r}'.format(token[1]), token)
+        return result
+
+    def _to_time(self, value_type, func):
+        if value_type == _TIME:
+            return func
+
+        second = self._second
+        return lambda values: func(values) * second
+
+    def _parse_sum(self):
+        left_type, left = self._parse_product()
+        while True:
+            token = self._peek()
+            if token[:2] not in (('op', '+'), ('op', '-')):
+                return left_type, left
+            self._next()
+
+            right_type, right = self._parse_product()
+            op = operator.add if token[1] == '+' else operator.sub
+
+            if left_type == right_type == _NUMBER:
+                result_type = _NUMBER
+            else:
+                result_type = _TIME
+                left = self._to_time(left_type, left)
+                right = self._to_time(right_type, right)
+
+            left_type = result_type
+            left = _binary(op, left, right)
+
+    def _parse_product(self):
+        left_type, left = self._parse_unary()
+        while True:
+            token = self._peek()
+            if token[:2] not in (('op', '*'), ('op', '/')):
+                return left_type, left
+            self._next()
+
+            right_type, right = self._parse_unary()
+            if token[1] == '*':
+                if left_type == right_type == _TIME:
+                    raise self._error('Cannot multiply two times', token)
+                op = operator.mul
+                result_type = _NUMBER if left_type == right_type else _TIME
+            else:
+                if left_type == _NUMBER and right_type == _TIME:
+                    raise self._error(
+                        'Cannot divide a number by a time', token)
+                op = _divide
+                result_type = _TIME if left_type != right_type else _NUMBER
+
+            left_type = result_type
+            left = _binary(op, left, right)
+
+    def _parse_unary(self):
+        token = self._peek()
+        if token[:2] == ('op', '-'):
+            self._next()
+            value_type, func = self._parse_unary()
+            return value_type, lambda values: -func(values)
+        elif token[:2] == ('op', '+'):
+            self._next()
+            return self._parse_unary()
+        else:
+            return self._parse_atom()
+
+    def _parse_atom(self):
+        token = self._next()
+        kind, value = token[:2]
+
+        if kind == 'time':
+            try:
+                time = str_to_ms(value, self._precision)
+            except ValueError:
+                raise self._error(
+                    'Invalid time {!r}'.format(value), token) from None
+            return _TIME, lambda values: time
+        elif kind == 'number':
+            number = Fraction(value) if '.' in value else int(value)
+            return _NUMBER, lambda values: number
+        elif kind == 'name':
+            self.variables.add(value)
+            return _TIME, lambda values: values[value]
+        elif token[:2] == ('op', '('):
+            result = self._parse_sum()
+            closing = self._next()
+            if closing[:2] != ('op', ')'):
+                raise self._error('Expected ")"', closing)
+            return result
+        elif kind == 'end':
+            raise self._error('Unexpected end of expression', token)
+        else:
+            raise self._error('Unexpected {!r}'.format(value), token)
+
+
+class Expression:
+    '''Compiled time expression.
+
+    Use compile_expression() to create one.
+    '''
+
+    def __init__(self, text, precision=Precision.MS):
+        parser = _Parser(text, precision)
+        self._type, self._func = parser.parse()
+        self.text = text
+        self.variables = frozenset(parser.variables)
+
+    @property
+    def is_time(self):
+        '''True if the expression gives a time rather than a number.'''
+        return self._type == _TIME
+
+    def evaluate(self, values=None):
+        '''Evaluate the expression.
+
+        values is a mapping of names of the variables of the expression
+        to their values, all in milliseconds (or other units of the
+        precision the expression was compiled with). It's not taken
+        as keyword arguments, which could clash with other parameters.
+
+        Returns an integer time if is_time is True, or an int or
+        a Fraction otherwise.
+
+        Raises ValueError if a variable is missing or on division
+        by zero.
+        '''
+        if values is None:
+            values = {}
+        missing = self.variables.difference(values)
+        if missing:
+            raise ValueError('No value for {}'.format(
+                ', '.join(sorted(missing))))
+
+        result = self._func(values)
+        if self._type == _TIME:
+            return round(result)
+        elif isinstance(result, Fraction) and result.denominator == 1:
+            return result.numerator
+        else:
+            return result
+
+    __call__ = evaluate
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text, precision=Precision.MS):
+    '''Compile an expression, reusing the cached result if possible.
+
+    Raises ValueError if the expression is invalid.
+    '''
+    return Expression(text, precision)
+
+
+def evaluate(text, values=None):
+    '''Compile (or take from the cache) and evaluate an expression.'''
+    return compile_expression(text).evaluate(values)
@@ -0,0 +1,127 @@
+'''Headless batch interface.
+
+Reads "time1 op time2" lines or time expressions and writes their
+results, one per line. This module must never import gi, directly or
+indirectly.
+'''
+
+import argparse
+import re
+import sys
+
+from . import app_info
+from .time_tools import ms_to_str, str_to_ms
+from .calculator.operation import Operation, calculate
+from .calculator.expression import compile_expression
+
+
+_OPERATION_MAP = {
+    '+': Operation.ADD,
+    '-': Operation.SUB,
+    '\N{MINUS SIGN}': Operation.SUB,
+    }
+
+_LINE_RE = re.compile(r'\s*(.*?)\s+([-+\N{MINUS SIGN}])\s+(.*?)\s*')
+
+
+def evaluate_line(line):
+    '''Evaluate a "time1 op time2" line or a time expression.
+
+    In the "time1 op time2" form, the operator must be surrounded by
+    whitespace, and, like in the calculator, the absolute values of
+    the times are used. Other lines are evaluated as expressions
+    (see calculator.expression).
+
+    Returns a (result, is_time) tuple, where result is either a time
+    in milliseconds or a number.
+
+    Raises ValueError if the line cannot be evaluated.
+    '''
+    match = _LINE_RE.fullmatch(line)
+    if match is not None:
+        time1, operation, time2 = match.groups()
+        try:
+            return calculate(
+                abs(str_to_ms(time1)),
+                _OPERATION_MAP[operation],
+                abs(str_to_ms(time2))), True
+        except ValueError:
+            pass
+
+    expression = compile_expression(line.strip())
+    return expression.evaluate(), expression.is_time
+
+
+def _format_number(number):
+    if isinstance(number, int):
+        return str(number)
+    else:
+        return repr(float(number))
+
+
+def process(lines, output, errors, name='<stdin>', unicode_symbols=False):
+    '''Evaluate lines and write the results to output.
+
+    Empty lines are skipped. Errors are written to errors with the
+    line number, and the line is skipped.
+
+    Returns the number of errors.
+    '''
+    num_errors = 0
+    for line_num, line in enumerate(lines, 1):
+        if not line or line.isspace():
+            continue
+
+        try:
+            result, is_time = evaluate_line(line)
+            if is_time:
+                text = ms_to_str(result, unicode_symbols)
+            else:
+                text = _format_number(result)
+        # Huge numbers overflow when converted to float
+        except (ValueError, OverflowError) as e:
+            errors.write('{}:{}: {}\n'.format(name, line_num, e))
+            num_errors += 1
+            continue
+
+        output.write(text)
+        output.write('\n')
+
+    return num_errors
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='{}-cli'.format(app_info.NAME),
+        description=(
+            'Evaluate "time1 op time2" lines, where op is + or -, or '
+            'time expressions like "(01:30:00 + 45:00) * 2", and print '
+            'the results.'))
+    parser.add_argument(
+        'files', nargs='*', default=['-'], metavar='FILE',
+        help='input files; "-" or nothing means standard input')
+    parser.add_argument(
+        '-u', '--unicode-symbols', action='store_true',
+        help='use MINUS SIGN and RATIO in the results')
+    parser.add_argument(
+        '--version', action='version',
+        version='%(prog)s {}'.format(app_info.VERSION))
+    args = parser.parse_args(args)
+
+    num_errors = 0
+    for path in args.files:
+        if path == '-':
+            num_errors += process(
+                sys.stdin, sys.stdout, sys.stderr,
+                unicode_symbols=args.unicode_symbols)
+            continue
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                num_errors += process(
+                    f, sys.stdout, sys.stderr, path, args.unicode_symbols)
+        except OSError as e:
+            sys.stderr.write('{}: {}\n'.format(path, e.strerror))
+            num_errors += 1
+
+    return 1 if num_errors else 0
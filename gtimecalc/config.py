@@ -7,5 +7,14 @@ from . import app_info
 
 
 CONFIG_DIR = os.path.join(GLib.get_user_config_dir(), app_info.NAME)
-if not os.path.isdir(CONFIG_DIR):
-    os.makedirs(CONFIG_DIR)
+
+
+def ensure_config_dir():
+    '''Create CONFIG_DIR if it doesn't exist yet.
+
+    This is done on demand rather than at import time, so that nothing
+    touches the file system before something is actually saved.
+
+    Raises OSError on failure.
+    '''
+    os.makedirs(CONFIG_DIR, exist_ok=True)
@@ -0,0 +1,13 @@
+'''Select versions of the GObject introspection libraries.
+
+Import this module before anything from gi.repository. The package
+itself doesn't import gi, so that the parts that don't need GTK (like
+time_tools and the command-line interface) can be used without it.
+'''
+
+import gi
+gi.require_version('Gtk', '3.0')
+gi.require_version('Gdk', '3.0')
+gi.require_version('Gio', '2.0')
+gi.require_version('GLib', '2.0')
+gi.require_version('GObject', '2.0')
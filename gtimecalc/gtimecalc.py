@@ -1,6 +1,7 @@
 
 from gettext import gettext as _
 
+from . import gi_versions  # Must be imported before gi.repository
 from gi.repository import Gtk, Gio, GLib
 
 from . import app_info
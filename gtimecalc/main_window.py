@@ -8,7 +8,6 @@ from . import app_info
 from .settings import settings
 from .common import WIDGET_SPACING
 from .calculator import Calculator
-from .notebook import Notebook
 
 
 _C_INT_MAX = 2 ** (struct.Struct('i').size * 8 - 1) - 1
@@ -35,16 +34,15 @@ class MainWindow(Gtk.ApplicationWindow):
         self._calculator.props.margin = WIDGET_SPACING
         grid.add(self._calculator)
 
-        self._notebook = Notebook(self._calculator)
-        grid.add(self._notebook)
-
         grid.show_all()
+        self._grid = grid
 
-        self._notebook.hide()
+        # The notebook is created when it's shown for the first time
+        self._notebook = None
         notebook_visible_action = Gio.SimpleAction.new_stateful(
             'notebook-visible',
             None,
-            GLib.Variant.new_boolean(self._notebook.get_visible()),
+            GLib.Variant.new_boolean(False),
             )
         notebook_visible_action.connect(
             'change-state', self._on_notebook_visible_toggle)
@@ -94,10 +92,19 @@ class MainWindow(Gtk.ApplicationWindow):
 
         return menubar
 
+    def _create_notebook(self):
+        from .notebook import Notebook
+
+        self._notebook = Notebook(self._calculator)
+        self._notebook.show_all()
+        self._notebook.set_visible(False)
+        self._grid.add(self._notebook)
+        self._notebook.load_state()
+
     def _udpate_geometry_hints(self):
         geometry = Gdk.Geometry()
         geometry.max_width = _C_INT_MAX
-        if self._notebook.get_visible():
+        if self._notebook is not None and self._notebook.get_visible():
             geometry.max_height = _C_INT_MAX
         else:
             geometry.max_height = -1
@@ -106,7 +113,12 @@ class MainWindow(Gtk.ApplicationWindow):
 
     def _on_notebook_visible_toggle(self, action, value):
         action.set_state(value)
-        self._notebook.set_visible(value.get_boolean())
+
+        visible = value.get_boolean()
+        if visible and self._notebook is None:
+            self._create_notebook()
+        if self._notebook is not None:
+            self._notebook.set_visible(visible)
         self._udpate_geometry_hints()
 
     def do_window_state_event(self, event):
@@ -131,11 +143,13 @@ class MainWindow(Gtk.ApplicationWindow):
         settings['window'] = state
 
         self._calculator.save_state()
-        self._notebook.save_state()
+        # If the notebook was never shown, it was never loaded either,
+        # so there is nothing to save.
+        if self._notebook is not None:
+            self._notebook.save_state()
 
     def load_state(self):
         self._calculator.load_state()
-        self._notebook.load_state()
 
         try:
             state = settings['window']
@@ -1,2 +1,10 @@
 
-from .notebook import Notebook
+def __getattr__(name):
+    # Notebook is a Gtk widget, so it's only imported on demand to
+    # keep the rest of the package usable without gi.
+    if name == 'Notebook':
+        from .notebook import Notebook
+        return Notebook
+
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
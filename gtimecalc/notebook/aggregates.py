@@ -0,0 +1,260 @@
+'''Range aggregates over a column of values.
+
+The notebook shows the sum, minimum, and maximum of the results of
+the selected equations. A selection is a few ranges of rows even when
+it has many rows, so instead of summing every selected value, the
+values are indexed once, and every range is then queried in O(log n).
+'''
+
+from bisect import bisect_left
+
+
+class FenwickTree:
+    '''Binary indexed tree of prefix sums.
+
+    Values can be appended and changed in O(log n), and the sum of any
+    range is found in O(log n).
+    '''
+
+    def __init__(self, values=()):
+        # 1-based; _tree[i] is the sum of (i - (i & -i), i]
+        tree = [0]
+        tree.extend(values)
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def append(self, value):
+        tree = self._tree
+        i = len(tree)
+        # The new node covers (i - (i & -i), i]; add the nodes of
+        # that range that already exist
+        low = i - (i & -i)
+        j = i - 1
+        while j > low:
+            value += tree[j]
+            j -= j & -j
+        tree.append(value)
+
+    def add(self, index, delta):
+        '''Add delta to the value at index.'''
+        tree = self._tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, stop):
+        '''Return the sum of the values in [0, stop).'''
+        tree = self._tree
+        result = 0
+        i = stop
+        while i > 0:
+            result += tree[i]
+            i -= i & -i
+        return result
+
+    def range_sum(self, start, stop):
+        '''Return the sum of the values in [start, stop).'''
+        return self.prefix_sum(stop) - self.prefix_sum(start)
+
+
+class MinMaxTree:
+    '''Segment tree of minimums and maximums.
+
+    Values can be appended and changed in O(log n), and the minimum
+    and maximum of any range are found in O(log n).
+    '''
+
+    def __init__(self, values=()):
+        values = list(values)
+        self._len = len(values)
+        capacity = 1
+        while capacity < self._len:
+            capacity *= 2
+        self._build(values, capacity)
+
+    def _build(self, values, capacity):
+        # Leaves are at [capacity, 2 * capacity); unused leaves and
+        # nodes without values are None
+        self._capacity = capacity
+        mins = [None] * capacity + values + [None] * (capacity - len(values))
+        maxs = mins[:]
+        for i in range(capacity - 1, 0, -1):
+            mins[i] = self._min(mins[2 * i], mins[2 * i + 1])
+            maxs[i] = self._max(maxs[2 * i], maxs[2 * i + 1])
+        self._mins = mins
+        self._maxs = maxs
+
+    @staticmethod
+    def _min(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a <= b else b
+
+    @staticmethod
+    def _max(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a >= b else b
+
+    def __len__(self):
+        return self._len
+
+    def append(self, value):
+        if self._len == self._capacity:
+            leaves = self._mins[self._capacity:]
+            self._build(leaves, max(1, 2 * self._capacity))
+        self._len += 1
+        self.set(self._len - 1, value)
+
+    def set(self, index, value):
+        i = index + self._capacity
+        mins = self._mins
+        maxs = self._maxs
+        mins[i] = maxs[i] = value
+        i //= 2
+        while i > 0:
+            mins[i] = self._min(mins[2 * i], mins[2 * i + 1])
+            maxs[i] = self._max(maxs[2 * i], maxs[2 * i + 1])
+            i //= 2
+
+    def range_min_max(self, start, stop):
+        '''Return (min, max) of the values in [start, stop).
+
+        Both are None if the range is empty.
+        '''
+        min_value = max_value = None
+        lo = start + self._capacity
+        hi = stop + self._capacity
+        while lo < hi:
+            if lo & 1:
+                min_value = self._min(min_value, self._mins[lo])
+                max_value = self._max(max_value, self._maxs[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                min_value = self._min(min_value, self._mins[hi])
+                max_value = self._max(max_value, self._maxs[hi])
+            lo //= 2
+            hi //= 2
+        return min_value, max_value
+
+
+class RangeAggregates:
+    '''Count, sum, minimum, and maximum over ranges of a column.
+
+    get_values is a function that returns the current column. The
+    index follows appends to the column by itself, in O(log n) per
+    value, and is rebuilt if get_values() returns another sequence.
+    A value inserted in the middle of the column must be reported by
+    insert(); after any other change, call invalidate(), and the index
+    will be rebuilt on the next query.
+    '''
+
+    # Inserted values are kept aside, since the trees can only grow at
+    # the end; queries and inserts take O(m) for m such values, so the
+    # index is rebuilt once there are more of them
+    MAX_INSERTED = 4096
+
+    def __init__(self, get_values):
+        self._get_values = get_values
+        self.invalidate()
+
+    def invalidate(self):
+        self._values = None
+        self._sums = None
+        self._min_max = None
+        # Ascending current positions of inserted values that are not
+        # in the trees, and the values
+        self._inserted_positions = []
+        self._inserted_values = []
+
+    def insert(self, position, value):
+        '''Report a value inserted in the column at position.'''
+        if self._sums is None:
+            return
+
+        positions = self._inserted_positions
+        num_values = len(self._sums) + len(positions)
+        if position == num_values and not positions:
+            # Appends are picked up by _update()
+            return
+        if len(positions) == self.MAX_INSERTED:
+            self.invalidate()
+            return
+
+        i = bisect_left(positions, position)
+        for j in range(i, len(positions)):
+            positions[j] += 1
+        positions.insert(i, position)
+        self._inserted_values.insert(i, value)
+
+    def _update(self):
+        values = self._get_values()
+        num_values = (
+            0 if self._sums is None
+            else len(self._sums) + len(self._inserted_positions))
+        if (values is not self._values
+                or self._sums is None
+                or num_values > len(values)
+                or (self._inserted_positions and num_values < len(values))
+                # Building is O(n), appending is O(n log n)
+                or len(values) > 2 * len(self._sums)):
+            self.invalidate()
+            self._values = values
+            self._sums = FenwickTree(values)
+            self._min_max = MinMaxTree(values)
+            return
+
+        # Appends; there are none if values were inserted
+        for i in range(num_values, len(values)):
+            self._sums.append(values[i])
+            self._min_max.append(values[i])
+
+    def query(self, ranges):
+        '''Return (count, sum, min, max) of the values in the ranges.
+
+        ranges is an iterable of (start, stop) tuples. min and max are
+        None if the ranges are empty.
+        '''
+        self._update()
+
+        positions = self._inserted_positions
+        count = 0
+        total = 0
+        min_value = max_value = None
+        for start, stop in ranges:
+            if start >= stop:
+                continue
+            count += stop - start
+
+            # Positions of the range in the trees, without the
+            # inserted values before and inside the range
+            lo = bisect_left(positions, start)
+            hi = bisect_left(positions, stop)
+            tree_start = start - lo
+            tree_stop = stop - hi
+            if tree_start < tree_stop:
+                total += self._sums.range_sum(tree_start, tree_stop)
+                range_min, range_max = self._min_max.range_min_max(
+                    tree_start, tree_stop)
+                min_value = MinMaxTree._min(min_value, range_min)
+                max_value = MinMaxTree._max(max_value, range_max)
+
+            for value in self._inserted_values[lo:hi]:
+                total += value
+                min_value = MinMaxTree._min(min_value, value)
+                max_value = MinMaxTree._max(max_value, value)
+
+        return count, total, min_value, max_value
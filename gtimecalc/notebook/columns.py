@@ -0,0 +1,64 @@
+'''Bulk operations on the columns of EquationStore.
+
+Columns are array('q'), list, or bytearray sequences of equal length.
+'''
+
+# From this number of ranges, deleting them one by one (each moves
+# the rest of the columns) is slower than rebuilding the columns;
+# see benchmarks/bench_remove.py.
+REBUILD_MIN_RANGES = 4
+
+
+def index_ranges(indices):
+    '''Coalesce ascending indices into a list of (start, stop) ranges.'''
+    ranges = []
+    start = stop = None
+    for index in indices:
+        if index != stop:
+            if start is not None:
+                ranges.append((start, stop))
+            start = index
+        stop = index + 1
+
+    if start is not None:
+        ranges.append((start, stop))
+
+    return ranges
+
+
+def delete_ranges(columns, ranges):
+    '''Delete ascending, non-overlapping (start, stop) ranges of rows.'''
+    for start, stop in reversed(ranges):
+        for values in columns:
+            del values[start:stop]
+
+
+def rebuild_without(columns, ranges):
+    '''Replace every column with a copy that lacks the given rows.
+
+    The rows between the ranges are copied with slices, so the time
+    depends on the number of rows and ranges, but not on their
+    product. columns must be a list, since its items are replaced.
+    '''
+    for i, values in enumerate(columns):
+        kept = values[:0]
+        prev_stop = 0
+        for start, stop in ranges:
+            kept += values[prev_stop:start]
+            prev_stop = stop
+        kept += values[prev_stop:]
+        columns[i] = kept
+
+
+def delete_rows(columns, indices):
+    '''Delete rows with the given ascending, unique indices.
+
+    Contiguous indices are coalesced into ranges that are deleted at
+    once; if there are too many ranges, the columns are rebuilt
+    instead. columns must be a list, since its items can be replaced.
+    '''
+    ranges = index_ranges(indices)
+    if len(ranges) < REBUILD_MIN_RANGES:
+        delete_ranges(columns, ranges)
+    else:
+        rebuild_without(columns, ranges)
@@ -1,29 +1,445 @@
 
+from array import array
+from functools import lru_cache
 from gettext import gettext as _
+import random
+import warnings
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GObject
 
 from ..time_tools import ms_to_str
+from .columns import delete_rows, index_ranges
+from . import sorting
 
 
-class EquationStore(Gtk.ListStore):
+OPERATION_SYMBOLS = ('+', '\N{MINUS SIGN}')
+
+
+@lru_cache(maxsize=4096)
+def format_time(ms):
+    '''Format time for display.
+
+    The list redraws the same cells over and over while scrolling,
+    so the strings are kept in a bounded LRU cache. Hit and miss
+    counters are available via format_time.cache_info().
+    '''
+    return ms_to_str(ms, True)
+
+
+class EquationStore(GObject.Object, Gtk.TreeModel, Gtk.TreeSortable):
+    '''List model of equations stored in columns.
+
+    Times are kept in array('q') columns and operations in a bytearray,
+    so a row costs 25 bytes instead of four boxed Python objects plus
+    the GtkListStore overhead. A time column that gets a value not
+    fitting in 64 bits is converted to a list.
+
+    Rows are (time1, time2, operation, result) tuples; all columns
+    are of the Python object type, like in a ListStore created with
+    four object columns. Iters hold row positions and only stay valid
+    until the next change of the store.
+
+    The store can be sorted by a time column (see Gtk.TreeSortable;
+    custom sort functions are not supported). Sorting doesn't move
+    the values: the columns keep the order of insertion, and a sort
+    order maps positions of rows to their indices in the columns.
+    '''
 
     COL_TIME1 = 0
     COL_TIME2 = 1
     COL_OPERATION = 2
     COL_RESULT = 3
 
+    _TIME_COLUMNS = (COL_TIME1, COL_TIME2, COL_RESULT)
+    _NUM_COLUMNS = 4
+
     def __init__(self):
-        super().__init__(
-            object,
-            object,
-            object,
-            object
-            )
+        super().__init__()
+        self._columns = self._new_columns()
+        self._stamp = random.randint(1, 2 ** 31 - 1)
+
+        self._sort_column_id = Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID
+        self._sort_order = Gtk.SortType.ASCENDING
+        # Index of the row at every position, or None if unsorted
+        self._order = None
+        # Ascending orders of columns and values of columns in the
+        # sort order; cleared on every change
+        self._sorted_indices = {}
+        self._sorted_columns = {}
+
+    @classmethod
+    def _new_columns(cls):
+        columns = [None] * cls._NUM_COLUMNS
+        for column in cls._TIME_COLUMNS:
+            columns[column] = array('q')
+        columns[cls.COL_OPERATION] = bytearray()
+        return columns
+
+    def __len__(self):
+        # The order can lack rows that are being removed
+        if self._order is not None:
+            return len(self._order)
+        return len(self._columns[self.COL_OPERATION])
+
+    def _create_iter(self, position):
+        tree_iter = Gtk.TreeIter()
+        tree_iter.stamp = self._stamp
+        tree_iter.user_data = position
+        return tree_iter
+
+    def _get_position(self, tree_iter):
+        # Position 0 can be returned as a NULL pointer
+        return tree_iter.user_data or 0
+
+    def get_index(self, tree_iter):
+        '''Return the index of the row in the columns.'''
+        position = self._get_position(tree_iter)
+        if self._order is None:
+            return position
+        return self._order[position]
+
+    def _changed(self):
+        self._sorted_indices.clear()
+        self._sorted_columns.clear()
+
+    def get_column(self, column):
+        '''Return all values of a column as a sequence.
+
+        For time columns, this is an array('q') or (if there are huge
+        values) a list; for the operation column, a bytearray. The
+        sequence must not be modified.
+
+        The values are in the order of insertion, regardless of
+        sorting; see also get_sorted_column().
+        '''
+        return self._columns[column]
+
+    def get_order(self):
+        '''Return the indices of the rows in the columns, in order.
+
+        This is a range if the store is not sorted. The sequence must
+        not be modified.
+        '''
+        if self._order is None:
+            return range(len(self))
+        return self._order
+
+    def get_sorted_column(self, column):
+        '''Return all values of a column in the order of rows.
+
+        Same as get_column() if the store is not sorted. Otherwise,
+        this is a copy that is made once per change of the store;
+        append() inserts the new value into it instead.
+        '''
+        values = self._columns[column]
+        if self._order is None:
+            return values
+
+        sorted_values = self._sorted_columns.get(column)
+        if sorted_values is None:
+            sorted_values = values[:0]
+            sorted_values.extend(map(values.__getitem__, self._order))
+            self._sorted_columns[column] = sorted_values
+        return sorted_values
+
+    def append(self, row):
+        '''Append an equation.
+
+        Returns the iter of the new row.
+        '''
+        index = len(self)
+        self._append_row(row)
+        self._sorted_indices.clear()
+
+        if self._order is None:
+            position = index
+        else:
+            position = sorting.insert_position(
+                self._columns[self._sort_column_id],
+                self._order,
+                row[self._sort_column_id],
+                self._sort_order == Gtk.SortType.DESCENDING)
+            self._order.insert(position, index)
+            # Inserting into the sorted copies is a memmove, unlike
+            # copying the whole columns again
+            for column, sorted_values in list(self._sorted_columns.items()):
+                try:
+                    sorted_values.insert(position, row[column])
+                except OverflowError:
+                    del self._sorted_columns[column]
+
+        tree_iter = self._create_iter(position)
+        self.row_inserted(Gtk.TreePath(position), tree_iter)
+        return tree_iter
+
+    def _append_row(self, row):
+        if len(row) != self._NUM_COLUMNS:
+            raise ValueError('Expected {} values, got {}'.format(
+                self._NUM_COLUMNS, len(row)))
+
+        index = len(self)
+        try:
+            for column, value in enumerate(row):
+                try:
+                    self._columns[column].append(value)
+                except OverflowError:
+                    if column == self.COL_OPERATION:
+                        raise
+                    self._columns[column] = list(self._columns[column])
+                    self._columns[column].append(value)
+        except (OverflowError, TypeError, ValueError):
+            for values in self._columns:
+                del values[index:]
+            raise
+
+    def extend(self, rows):
+        '''Append many (time1, time2, operation, result) rows at once.'''
+        rows = list(rows)
+        if rows:
+            self.extend_columns(list(zip(*rows)))
+
+    def extend_columns(self, columns):
+        '''Append equations given as four column sequences at once.
+
+        The values are appended to the columns in bulk, and the
+        row-inserted signal is only emitted if something listens to
+        it. Detach the store from the view (see
+        Notebook._detach_store()) around the call to avoid the view
+        handling rows one by one. If the store is sorted, the rows are
+        inserted at the end and then sorted.
+        '''
+        if len(columns) != self._NUM_COLUMNS:
+            raise ValueError('Expected {} columns, got {}'.format(
+                self._NUM_COLUMNS, len(columns)))
+        num_rows = len(columns[0])
+        if any(len(values) != num_rows for values in columns):
+            raise ValueError('Columns have different lengths')
+
+        index = len(self)
+        try:
+            for column, values in enumerate(columns):
+                self._extend_column(column, index, values)
+        except (OverflowError, TypeError, ValueError):
+            for values in self._columns:
+                del values[index:]
+            raise
+
+        self._changed()
+        if self._order is not None:
+            self._order.extend(range(index, index + num_rows))
+
+        if self._has_handlers('row-inserted'):
+            for i in range(index, len(self)):
+                self.row_inserted(Gtk.TreePath(i), self._create_iter(i))
+
+        if self._order is not None:
+            self._sort()
+
+    def _extend_column(self, column, index, values):
+        if column == self.COL_OPERATION:
+            self._columns[column].extend(values)
+            return
+
+        try:
+            self._columns[column].extend(values)
+        except OverflowError:
+            # array.extend() may stop halfway
+            del self._columns[column][index:]
+            self._columns[column] = list(self._columns[column])
+            self._columns[column].extend(values)
+
+    _signal_ids = {}
+
+    def _has_handlers(self, signal_name):
+        '''Check if anything is connected to the signal.
+
+        Bulk changes use this to skip emitting signals per row when
+        no view is attached.
+        '''
+        signal_id = self._signal_ids.get(signal_name)
+        if signal_id is None:
+            signal_id = GObject.signal_lookup(signal_name, type(self))
+            self._signal_ids[signal_name] = signal_id
+        return GObject.signal_has_handler_pending(self, signal_id, 0, True)
 
     def remove_equations(self, tree_paths):
-        for tree_path in reversed(tree_paths):
-            self.remove(self.get_iter(tree_path))
+        '''Remove rows with the given paths.
+
+        The rows are removed from the columns in bulk (see
+        columns.delete_rows()). If anything listens to row-deleted,
+        it's first emitted for every row, starting from the last one;
+        every range of consecutive rows is removed from the order of
+        rows right before its signals, so listeners see the store
+        without the rows.
+
+        Returns the ascending indices of the removed rows in the
+        columns.
+        '''
+        positions = sorted(
+            set(tree_path.get_indices()[0] for tree_path in tree_paths))
+        order = self._order
+        if order is None:
+            indices = positions
+        else:
+            indices = sorted(order[i] for i in positions)
+
+        if self._has_handlers('row-deleted'):
+            self._emit_row_deleted(index_ranges(positions))
+
+        if order is not None:
+            self._order = sorting.remove_indices(order, indices)
+        delete_rows(self._columns, indices)
+        self._changed()
+
+        return indices
+
+    def _emit_row_deleted(self, ranges):
+        # Emit row-deleted for ascending (start, stop) ranges of
+        # positions, removing them from a copy of the order; the
+        # columns keep all rows, which the copy refers to. The order
+        # is restored afterwards.
+        order = self._order
+        if order is None:
+            self._order = array('q', range(len(self)))
+        else:
+            self._order = order[:]
+        self._changed()
+        try:
+            for start, stop in reversed(ranges):
+                if stop == len(self._order):
+                    # Removing the last row is cheap, so rows at the
+                    # end are removed one by one, right before their
+                    # signals; this is always the case for clear()
+                    for position in reversed(range(start, stop)):
+                        del self._order[position]
+                        self.row_deleted(Gtk.TreePath(position))
+                else:
+                    del self._order[start:stop]
+                    for position in reversed(range(start, stop)):
+                        self.row_deleted(Gtk.TreePath(position))
+        finally:
+            self._order = order
+
+    def clear(self):
+        if self._has_handlers('row-deleted'):
+            self._emit_row_deleted([(0, len(self))])
+
+        self._columns = self._new_columns()
+        self._changed()
+        if self._order is not None:
+            self._order = array('q')
+
+    def _sort(self):
+        if self._sort_column_id < 0:
+            order = None
+        else:
+            ascending = self._sorted_indices.get(self._sort_column_id)
+            if ascending is None:
+                ascending = sorting.sorted_indices(
+                    self._columns[self._sort_column_id])
+                self._sorted_indices[self._sort_column_id] = ascending
+            if self._sort_order == Gtk.SortType.DESCENDING:
+                order = ascending[::-1]
+            else:
+                # Copy, since append() inserts into the order
+                order = ascending[:]
+
+        old_order = self._order
+        self._order = order
+        self._sorted_columns.clear()
+
+        if len(self) > 1 and self._has_handlers('rows-reordered'):
+            self.rows_reordered(
+                Gtk.TreePath(),
+                None,
+                sorting.reorder_map(old_order, order, len(self)))
+
+    def do_get_sort_column_id(self):
+        return (
+            self._sort_column_id >= 0,
+            self._sort_column_id,
+            self._sort_order)
+
+    def do_set_sort_column_id(self, sort_column_id, order):
+        if (sort_column_id != Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID
+                and sort_column_id not in self._TIME_COLUMNS):
+            raise ValueError(
+                'Can\'t sort by column {}'.format(sort_column_id))
+
+        if (sort_column_id == self._sort_column_id
+                and order == self._sort_order):
+            return
+
+        self._sort_column_id = sort_column_id
+        self._sort_order = order
+        self.sort_column_changed()
+        self._sort()
+
+    # GTK calls these from C, where an exception would only be printed
+    def do_set_sort_func(self, sort_column_id, sort_func, *user_data):
+        warnings.warn(
+            'EquationStore ignores custom sort functions', RuntimeWarning)
+
+    def do_set_default_sort_func(self, sort_func, *user_data):
+        warnings.warn(
+            'EquationStore ignores custom sort functions', RuntimeWarning)
+
+    def do_has_default_sort_func(self):
+        return False
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY
+
+    def do_get_n_columns(self):
+        return self._NUM_COLUMNS
+
+    def do_get_column_type(self, column):
+        return GObject.TYPE_PYOBJECT
+
+    def do_get_iter(self, tree_path):
+        indices = tree_path.get_indices()
+        if len(indices) == 1 and 0 <= indices[0] < len(self):
+            return True, self._create_iter(indices[0])
+        return False, None
+
+    def do_get_path(self, tree_iter):
+        return Gtk.TreePath(self._get_position(tree_iter))
+
+    def do_get_value(self, tree_iter, column):
+        return self._columns[column][self.get_index(tree_iter)]
+
+    def do_iter_next(self, tree_iter):
+        position = self._get_position(tree_iter) + 1
+        if position < len(self):
+            return True, self._create_iter(position)
+        return False, None
+
+    def do_iter_previous(self, tree_iter):
+        position = self._get_position(tree_iter) - 1
+        if position >= 0:
+            return True, self._create_iter(position)
+        return False, None
+
+    def do_iter_children(self, parent):
+        if parent is None and len(self) > 0:
+            return True, self._create_iter(0)
+        return False, None
+
+    def do_iter_has_child(self, tree_iter):
+        return False
+
+    def do_iter_n_children(self, tree_iter):
+        if tree_iter is None:
+            return len(self)
+        return 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is None and 0 <= n < len(self):
+            return True, self._create_iter(n)
+        return False, None
+
+    def do_iter_parent(self, child):
+        return False, None
 
 
 class EquationList(Gtk.TreeView):
@@ -33,9 +449,16 @@ class EquationList(Gtk.TreeView):
             model=equation_store,
             rubber_banding=True,
             fixed_height_mode=True,
-            headers_visible=False
             )
 
+        # The model of the view can be a filter of the store, which
+        # isn't sortable, so sorting is handled here instead of by
+        # Gtk.TreeViewColumn.set_sort_column_id()
+        self._eq_store = equation_store
+        self._sort_columns = {}
+        equation_store.connect(
+            'sort-column-changed', self._on_sort_column_changed)
+
         # Time 1
         renderer = Gtk.CellRendererText(xalign=1.0)
         col_time1 = Gtk.TreeViewColumn(_('Time 1'), renderer)
@@ -43,6 +466,7 @@ class EquationList(Gtk.TreeView):
         col_time1.set_expand(True)
         col_time1.set_cell_data_func(
             renderer, self._render_time, EquationStore.COL_TIME1)
+        self._make_sortable(col_time1, EquationStore.COL_TIME1)
         self.append_column(col_time1)
 
         # Operation
@@ -60,6 +484,7 @@ class EquationList(Gtk.TreeView):
         col_time2.set_expand(True)
         col_time2.set_cell_data_func(
             renderer, self._render_time, EquationStore.COL_TIME2)
+        self._make_sortable(col_time2, EquationStore.COL_TIME2)
         self.append_column(col_time2)
 
         # Equals
@@ -75,10 +500,36 @@ class EquationList(Gtk.TreeView):
         col_result.set_expand(True)
         col_result.set_cell_data_func(
             renderer, self._render_time, EquationStore.COL_RESULT)
+        self._make_sortable(col_result, EquationStore.COL_RESULT)
         self.append_column(col_result)
 
+    def _make_sortable(self, tree_column, column):
+        tree_column.set_clickable(True)
+        tree_column.connect('clicked', self._on_column_clicked, column)
+        self._sort_columns[column] = tree_column
+
+    def _on_column_clicked(self, tree_column, column):
+        # Ascending, descending, and back to the order of insertion
+        sort_column_id, order = self._eq_store.get_sort_column_id()
+        if sort_column_id != column:
+            order = Gtk.SortType.ASCENDING
+        elif order == Gtk.SortType.ASCENDING:
+            order = Gtk.SortType.DESCENDING
+        else:
+            column = Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID
+            order = Gtk.SortType.ASCENDING
+        self._eq_store.set_sort_column_id(column, order)
+
+    def _on_sort_column_changed(self, equation_store):
+        sort_column_id, order = equation_store.get_sort_column_id()
+        for column, tree_column in self._sort_columns.items():
+            tree_column.set_sort_indicator(column == sort_column_id)
+            if column == sort_column_id:
+                tree_column.set_sort_order(order)
+
     def _render_time(self, col, cell, model, tree_iter, col_num):
-        cell.props.text = ms_to_str(model[tree_iter][col_num], True)
+        cell.props.text = format_time(model.get_value(tree_iter, col_num))
 
     def _render_operation(self, col, cell, model, tree_iter, col_num):
-        cell.props.text = ('+', '\N{MINUS SIGN}')[model[tree_iter][col_num]]
+        cell.props.text = OPERATION_SYMBOLS[
+            model.get_value(tree_iter, col_num)]
@@ -1,40 +1,14 @@
 
-from gettext import gettext as _
-from itertools import chain, compress
+from gettext import gettext as _, ngettext
+from itertools import islice
 import os
+import threading
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib, Pango
 
-from .equation_list import EquationStore
+from . import exporting
 from ..common import WIDGET_SPACING
 from ..settings import settings
-from ..time_tools import ms_to_str
-
-
-def _format(s, replacements):
-    result = ''
-
-    copy_start = 0
-    search_start = 0
-    while True:
-        idx = s.find('%', search_start, -1)
-        if idx == -1:
-            result += s[copy_start:]
-            break
-
-        search_start = idx + 2
-
-        replacement = replacements.get(s[idx + 1])
-        if replacement is None:
-            continue
-
-        if copy_start != idx:
-            result += s[copy_start:idx]
-
-        result += replacement
-        copy_start = search_start
-
-    return result
 
 
 class ExportDialog(Gtk.Dialog):
@@ -42,12 +16,39 @@ class ExportDialog(Gtk.Dialog):
     _FORMAT_SPECIFIERS = ('1', '2', 'o', 'r', 'n', 't', '%')
     _DEFAULT_FORMAT = '%1 %o %2 = %r'
 
+    _EXPORT_FORMAT_NAMES = (
+        (exporting.FORMAT_TEMPLATE, _('Text by format')),
+        (exporting.FORMAT_CSV, 'CSV'),
+        (exporting.FORMAT_TSV, 'TSV'),
+        (exporting.FORMAT_JSONL, 'JSON Lines'),
+        (exporting.FORMAT_COLUMNS, _('Binary columns (int64)')),
+        )
+    _TIMES_NAMES = (
+        (exporting.TIMES_TEXT, _('Text')),
+        (exporting.TIMES_MS, _('Milliseconds')),
+        (exporting.TIMES_BOTH, _('Text and milliseconds')),
+        )
+
     _LINE_ENDINGS = ('\n', '\r\n', '\r')
     _LINE_ENDING_NAMES = ('unix', 'win', 'mac')
 
     _MAX_FORMAT_HISTORY = 10
 
-    def __init__(self, parent, selection):
+    # The preview only shows the beginning of the export; the file is
+    # written from the equations, not from the preview
+    _PREVIEW_MAX_LINES = 1000
+    # Delay in milliseconds before the preview is updated after typing
+    _PREVIEW_DELAY = 150
+
+    def __init__(self, parent, selection, columns, get_indices):
+        '''Create the dialog.
+
+        selection is the selection of the equation list. columns is
+        the (time1, time2, operation, result) sequence of the columns
+        of the store, and get_indices is a function that returns the
+        indices of the rows shown in the list, in the order of the
+        list. The columns must not change while the dialog is open.
+        '''
         super().__init__(
             title=_('Save equations'),
             transient_for=parent,
@@ -60,19 +61,14 @@ class ExportDialog(Gtk.Dialog):
             _('_Save'), Gtk.ResponseType.OK,
             )
 
-        self._eqs = []
-        self._eq_is_selected = []
-
-        equation_store = selection.get_tree_view().get_model()
-        for row in equation_store:
-            eq_str = (
-                ms_to_str(row[EquationStore.COL_TIME1]),
-                ms_to_str(row[EquationStore.COL_TIME2]),
-                ('+', '-')[row[EquationStore.COL_OPERATION]],
-                ms_to_str(row[EquationStore.COL_RESULT])
-                )
-            self._eqs.append(eq_str)
-            self._eq_is_selected.append(selection.iter_is_selected(row.iter))
+        # Raw values are formatted only for the preview and while
+        # writing, and rows are looked up only when needed, so opening
+        # the dialog doesn't depend on the size of the notebook
+        self._eqs = columns
+        self._selection = selection
+        self._get_listed_indices = get_indices
+        self._listed_indices = None
+        self._selected_indices = None
 
         if 'export' in settings and isinstance(settings['export'], dict):
             self._settings = settings['export']
@@ -82,6 +78,8 @@ class ExportDialog(Gtk.Dialog):
 
         self._textbuf = Gtk.TextBuffer()
         self._textbuf.create_tag('monospace', family='monospace')
+        self._preview_source_id = 0
+        self.connect('destroy', self._on_destroy)
 
         self._create_ui()
         self._format_text()
@@ -91,12 +89,39 @@ class ExportDialog(Gtk.Dialog):
         area.props.margin = WIDGET_SPACING
         area.props.spacing = WIDGET_SPACING // 2
 
+        # Export format and times
+
+        grid = Gtk.Grid(
+            column_spacing=WIDGET_SPACING,
+            row_spacing=WIDGET_SPACING // 2
+            )
+        area.add(grid)
+
+        grid.attach(Gtk.Label(label=_('Type:'), xalign=0.0), 0, 0, 1, 1)
+        self._type_combo = Gtk.ComboBoxText(hexpand=True)
+        for export_format, name in self._EXPORT_FORMAT_NAMES:
+            self._type_combo.append(export_format, name)
+        if not self._type_combo.set_active_id(self._settings.get('type')):
+            self._type_combo.set_active_id(exporting.FORMAT_TEMPLATE)
+        self._type_combo.connect('changed', self._on_type_changed)
+        grid.attach(self._type_combo, 1, 0, 1, 1)
+
+        grid.attach(Gtk.Label(label=_('Times:'), xalign=0.0), 0, 1, 1, 1)
+        self._times_combo = Gtk.ComboBoxText(hexpand=True)
+        for times, name in self._TIMES_NAMES:
+            self._times_combo.append(times, name)
+        if not self._times_combo.set_active_id(self._settings.get('times')):
+            self._times_combo.set_active_id(exporting.TIMES_TEXT)
+        self._times_combo.connect('changed', self._format_text)
+        grid.attach(self._times_combo, 1, 1, 1, 1)
+
         # Format
 
         grid = Gtk.Grid(
             orientation=Gtk.Orientation.HORIZONTAL,
             column_spacing=WIDGET_SPACING
             )
+        self._format_grid = grid
         area.add(grid)
 
         grid.add(Gtk.Label(label=_('Format:')))
@@ -131,11 +156,11 @@ class ExportDialog(Gtk.Dialog):
         if not isinstance(format_string, str):
             format_string = self._DEFAULT_FORMAT
         self._format_entry.set_text(format_string)
-        self._format_entry.connect('changed', self._format_text)
+        self._format_entry.connect('changed', self._on_format_changed)
 
         # Selected only
 
-        has_selected_eqs = any(self._eq_is_selected)
+        has_selected_eqs = self._selection.count_selected_rows() > 0
         self._btn_only_selected = Gtk.CheckButton(
             label=_('Only selected equations'),
             active=False,
@@ -154,6 +179,7 @@ class ExportDialog(Gtk.Dialog):
             orientation=Gtk.Orientation.HORIZONTAL,
             column_spacing=WIDGET_SPACING
             )
+        self._le_grid = grid
         area.add(grid)
 
         grid.add(Gtk.Label(label=_('Line endings:')))
@@ -189,7 +215,13 @@ class ExportDialog(Gtk.Dialog):
         scrolled.add(preview)
         area.add(scrolled)
 
+        self._more_label = Gtk.Label(xalign=0.0, no_show_all=True)
+        self._more_label.get_style_context().add_class(
+            Gtk.STYLE_CLASS_DIM_LABEL)
+        area.add(self._more_label)
+
         area.show_all()
+        self._update_sensitivity()
 
     def do_response(self, response_id):
         format_string = self._format_entry.get_text()
@@ -197,6 +229,9 @@ class ExportDialog(Gtk.Dialog):
         self._settings['only_selected'] = self._btn_only_selected.get_active()
         self._settings['line_endings'] = (
             self._LINE_ENDING_NAMES[self._le_combo.get_active()])
+        self._settings['type'] = self._type_combo.get_active_id()
+        self._settings['times'] = self._times_combo.get_active_id()
+        settings.save_later()
 
         if response_id != Gtk.ResponseType.OK:
             return
@@ -233,49 +268,224 @@ class ExportDialog(Gtk.Dialog):
         save_dlg.set_current_folder(path)
 
         if save_dlg.run() == Gtk.ResponseType.OK:
-            line_endings = self._LINE_ENDINGS[self._le_combo.get_active()]
-
-            start, end = self._textbuf.get_bounds()
-            text = self._textbuf.get_text(start, end, False)
-
+            path = save_dlg.get_filename()
             try:
-                with open(save_dlg.get_filename(), 'w', newline=line_endings) as f:
-                    f.write(text)
-                    f.write('\n')
+                self._write(save_dlg, path)
             except OSError as e:
-                error_dlg = Gtk.MessageDialog(
-                    message_type=Gtk.MessageType.ERROR,
-                    text=e.strerror,
-                    secondary_text=e.filename,
-                    transient_for=save_dlg,
-                    destroy_with_parent=True
-                    )
-                error_dlg.add_buttons(
-                    _('_OK'), Gtk.ResponseType.OK,
-                    )
-                error_dlg.run()
-                error_dlg.destroy()
+                self._show_error(save_dlg, e.strerror, e.filename)
+            except OverflowError:
+                self._show_error(
+                    save_dlg,
+                    _('Times don\'t fit in 64-bit integers'),
+                    path)
 
             self._settings['path'] = save_dlg.get_current_folder()
 
         save_dlg.destroy()
+        settings.save_later()
+
+    def _show_error(self, parent, text, secondary_text):
+        error_dlg = Gtk.MessageDialog(
+            message_type=Gtk.MessageType.ERROR,
+            text=text,
+            secondary_text=secondary_text,
+            transient_for=parent,
+            destroy_with_parent=True
+            )
+        error_dlg.add_buttons(
+            _('_OK'), Gtk.ResponseType.OK,
+            )
+        error_dlg.run()
+        error_dlg.destroy()
+
+    def _write(self, parent, path):
+        '''Write the file in a worker thread, showing the progress.
+
+        Raises OSError or OverflowError on failure.
+        '''
+        indices = self._get_indices()
+        progress_dlg = _ProgressDialog(parent, path, len(indices))
+        cancelled = threading.Event()
+        errors = []
+
+        # Widgets must only be used from the main thread
+        args = (path, self._type_combo.get_active_id(), self._eqs, indices)
+        kwargs = dict(
+            line_ending=self._LINE_ENDINGS[self._le_combo.get_active()],
+            progress=progress_dlg.set_num_written,
+            cancelled=cancelled,
+            template=exporting.Template(self._format_entry.get_text()),
+            times=self._times_combo.get_active_id())
+
+        def write():
+            try:
+                exporting.export_file(*args, **kwargs)
+            except (OSError, OverflowError) as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=write, daemon=True)
+        thread.start()
+        if progress_dlg.wait(thread) != Gtk.ResponseType.OK:
+            cancelled.set()
+        # The writer stops after the current chunk
+        thread.join()
+        progress_dlg.destroy()
+
+        if errors:
+            raise errors[0]
+
+    def _get_indices(self):
+        if self._listed_indices is None:
+            self._listed_indices = self._get_listed_indices()
+        if not self._btn_only_selected.get_active():
+            return self._listed_indices
+
+        if self._selected_indices is None:
+            # Paths of the list are positions in the listed indices
+            self._selected_indices = [
+                self._listed_indices[tree_path.get_indices()[0]]
+                for tree_path in self._selection.get_selected_rows()[1]]
+        return self._selected_indices
+
+    def _on_type_changed(self, combo):
+        self._update_sensitivity()
+        self._format_text()
+
+    def _update_sensitivity(self):
+        export_format = self._type_combo.get_active_id()
+        self._format_grid.set_sensitive(
+            export_format == exporting.FORMAT_TEMPLATE)
+        self._times_combo.set_sensitive(export_format in (
+            exporting.FORMAT_CSV,
+            exporting.FORMAT_TSV,
+            exporting.FORMAT_JSONL))
+        self._le_grid.set_sensitive(not exporting.is_binary(export_format))
+
+    def _on_format_changed(self, entry):
+        # Don't update the preview on every keystroke
+        self._cancel_preview_update()
+        self._preview_source_id = GLib.timeout_add(
+            self._PREVIEW_DELAY, self._on_preview_timeout)
+
+    def _on_preview_timeout(self):
+        self._preview_source_id = 0
+        self._format_text()
+        return GLib.SOURCE_REMOVE
+
+    def _cancel_preview_update(self):
+        if self._preview_source_id:
+            GLib.source_remove(self._preview_source_id)
+            self._preview_source_id = 0
+
+    def _on_destroy(self, widget):
+        self._cancel_preview_update()
 
     def _format_text(self, *args):
-        if self._btn_only_selected.get_active():
-            eqs = compress(self._eqs, self._eq_is_selected)
+        self._cancel_preview_update()
+
+        indices = self._get_indices()
+        export_format = self._type_combo.get_active_id()
+        num_more = len(indices) - self._PREVIEW_MAX_LINES
+        if exporting.is_binary(export_format):
+            text = ngettext(
+                'Binary file with {num} equation',
+                'Binary file with {num} equations',
+                len(indices)).format(num=len(indices))
+            num_more = 0
         else:
-            eqs = self._eqs
-
-        format_string = self._format_entry.get_text()
-        lines = []
-        for eq in eqs:
-            replacements = dict(
-                zip(self._FORMAT_SPECIFIERS, chain(eq, ('\n', '\t', '%'))))
-            lines.append(_format(format_string, replacements))
+            text = '\n'.join(islice(
+                exporting.iter_lines(
+                    export_format,
+                    self._eqs,
+                    indices[:self._PREVIEW_MAX_LINES],
+                    template=exporting.Template(
+                        self._format_entry.get_text()),
+                    times=self._times_combo.get_active_id()),
+                self._PREVIEW_MAX_LINES))
+
+        if num_more > 0:
+            self._more_label.set_text(
+                ngettext(
+                    '… and {num} more equation',
+                    '… and {num} more equations',
+                    num_more).format(num=num_more))
+            self._more_label.show()
+        else:
+            self._more_label.hide()
 
         self._textbuf.delete(*self._textbuf.get_bounds())
         self._textbuf.insert_with_tags_by_name(
             self._textbuf.get_start_iter(),
-            '\n'.join(lines),
+            text,
             'monospace'
             )
+
+
+class _ProgressDialog(Gtk.Dialog):
+    '''Progress of writing a file in a worker thread.'''
+
+    # Interval in milliseconds of updating the progress bar
+    _UPDATE_INTERVAL = 100
+
+    def __init__(self, parent, path, num_rows):
+        super().__init__(
+            title=_('Saving'),
+            transient_for=parent,
+            destroy_with_parent=True,
+            modal=True,
+            default_width=350
+            )
+        self.add_buttons(
+            _('_Cancel'), Gtk.ResponseType.CANCEL,
+            )
+
+        self._num_rows = num_rows
+        # Set by the worker thread and read by the main one
+        self._num_written = 0
+
+        area = self.get_content_area()
+        area.props.margin = WIDGET_SPACING
+        area.props.spacing = WIDGET_SPACING // 2
+
+        area.add(
+            Gtk.Label(
+                label=_('Saving “{}”…').format(os.path.basename(path)),
+                xalign=0.0,
+                ellipsize=Pango.EllipsizeMode.MIDDLE
+            ))
+
+        self._progress_bar = Gtk.ProgressBar(show_text=True)
+        area.add(self._progress_bar)
+
+        area.show_all()
+
+    def set_num_written(self, num_written):
+        '''Report progress; can be called from any thread.'''
+        self._num_written = num_written
+
+    def wait(self, thread):
+        '''Run the dialog until the thread exits or the user cancels.
+
+        Returns Gtk.ResponseType.OK if the thread exited.
+        '''
+        self._thread = thread
+        source_id = GLib.timeout_add(self._UPDATE_INTERVAL, self._update)
+        try:
+            return self.run()
+        finally:
+            if self._thread is not None:
+                GLib.source_remove(source_id)
+
+    def _update(self):
+        if not self._thread.is_alive():
+            self._thread = None
+            self.response(Gtk.ResponseType.OK)
+            return GLib.SOURCE_REMOVE
+
+        num_written = self._num_written
+        self._progress_bar.set_fraction(
+            num_written / self._num_rows if self._num_rows else 1.0)
+        self._progress_bar.set_text(
+            _('{written} of {total}').format(
+                written=num_written, total=self._num_rows))
+        return GLib.SOURCE_CONTINUE
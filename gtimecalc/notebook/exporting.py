@@ -0,0 +1,394 @@
+'''Formatting of exported equations.
+
+Equations can be exported as text formatted by a template, as CSV,
+TSV, or JSON Lines, or as binary columns.
+
+The template is a string with specifiers:
+
+    %1  time 1
+    %2  time 2
+    %o  operation
+    %r  result
+    %n  new line
+    %t  tabulation
+    %%  %
+
+Other characters, including % followed by anything else, are copied
+as is. A format string is compiled once into a str.format() pattern,
+which then formats every equation in C.
+
+CSV, TSV, and JSON Lines have the same fields as the JSON layout of
+the notebook (see storage): "time_1", "time_2", "operation", and
+"result". Times are ms_to_str() strings, integer milliseconds in the
+fields with the "_ms" suffix, or both, depending on TIMES_* options.
+
+The binary format starts with a 24-byte header:
+
+    magic       8 bytes, b'GTCCOLS\0'
+    version     uint32, currently 1
+    num_columns uint32, currently 4
+    num_rows    uint64
+
+followed by the time1, time2, operation, and result columns, each
+being num_rows int64 values. All numbers are little-endian, so, for
+example, NumPy can load the columns with:
+
+    numpy.fromfile(path, '<i8', offset=24).reshape(4, -1)
+
+Exported files are written by a pipeline of generators that passes
+equations in chunks, so neither the formatted text nor the preview
+has to hold the whole export. Raw times are formatted only in the
+chunk being written, and only for the columns that are exported.
+'''
+
+from array import array
+from itertools import chain, islice, repeat
+import os
+import struct
+import sys
+
+from ..time_tools import ms_to_str_many
+
+
+# Number of lines passed through the pipeline at once
+CHUNK_SIZE = 10000
+
+FORMAT_TEMPLATE = 'template'
+FORMAT_CSV = 'csv'
+FORMAT_TSV = 'tsv'
+FORMAT_JSONL = 'jsonl'
+FORMAT_COLUMNS = 'columns'
+
+FORMATS = (
+    FORMAT_TEMPLATE, FORMAT_CSV, FORMAT_TSV, FORMAT_JSONL, FORMAT_COLUMNS)
+
+TIMES_TEXT = 'text'
+TIMES_MS = 'ms'
+TIMES_BOTH = 'both'
+
+TIMES = (TIMES_TEXT, TIMES_MS, TIMES_BOTH)
+
+COLUMNS_MAGIC = b'GTCCOLS\0'
+COLUMNS_VERSION = 1
+
+_COLUMNS_HEADER = struct.Struct('<8sIIQ')
+
+_FIELD_NAMES = ('time_1', 'time_2', 'operation', 'result')
+_OPERATION_FIELD = 2
+_OPERATION_SYMBOLS = ('+', '-')
+
+# Fields are indices in (time1, time2, operation, result) rows, the
+# same as the columns of EquationStore
+_FIELD_SPECIFIERS = {
+    '1': 0,
+    '2': 1,
+    'o': 2,
+    'r': 3,
+    }
+
+_TEXT_SPECIFIERS = {
+    'n': '\n',
+    't': '\t',
+    '%': '%',
+    }
+
+
+def _escape(s):
+    return s.replace('{', '{{').replace('}', '}}')
+
+
+class Template:
+    '''Compiled export format string.
+
+    fields are the (time1, time2, operation, result) indices that
+    the format references, in order of first use.
+    '''
+
+    def __init__(self, format_string):
+        self.format_string = format_string
+
+        fields = []
+        parts = []
+        copy_start = 0
+        search_start = 0
+        while True:
+            # A % at the very end is not a specifier
+            idx = format_string.find('%', search_start, -1)
+            if idx == -1:
+                parts.append(_escape(format_string[copy_start:]))
+                break
+
+            search_start = idx + 2
+
+            specifier = format_string[idx + 1]
+            if specifier in _FIELD_SPECIFIERS:
+                field = _FIELD_SPECIFIERS[specifier]
+                if field not in fields:
+                    fields.append(field)
+                replacement = '{{{}}}'.format(fields.index(field))
+            elif specifier in _TEXT_SPECIFIERS:
+                replacement = _escape(_TEXT_SPECIFIERS[specifier])
+            else:
+                continue
+
+            parts.append(_escape(format_string[copy_start:idx]))
+            parts.append(replacement)
+            copy_start = search_start
+
+        self.fields = tuple(fields)
+        self._pattern = ''.join(parts)
+
+    def format(self, row):
+        '''Format a (time1, time2, operation, result) row of strings.'''
+        return self._pattern.format(*[row[field] for field in self.fields])
+
+    def format_columns(self, columns, num_rows):
+        '''Return an iterator of formatted rows given as columns.
+
+        columns is a (time1, time2, operation, result) sequence of
+        iterables of strings; only the ones in fields are used, so the
+        rest can be None.
+        '''
+        if not self.fields:
+            return repeat(self._pattern.format(), num_rows)
+        return map(
+            self._pattern.format, *[columns[field] for field in self.fields])
+
+
+def iter_chunks(iterable, size=CHUNK_SIZE):
+    '''Split an iterable into lists of up to size items.'''
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def is_binary(export_format):
+    return export_format == FORMAT_COLUMNS
+
+
+def iter_row_chunks(columns, indices, chunk_size=CHUNK_SIZE):
+    '''Yield chunks of rows as lists of raw column values.
+
+    columns is a (time1, time2, operation, result) sequence of
+    sequences, and indices is an iterable of indices of the rows to
+    take, in order.
+    '''
+    for chunk in iter_chunks(indices, chunk_size):
+        yield [list(map(values.__getitem__, chunk)) for values in columns]
+
+
+def format_column(field, values):
+    '''Convert raw values of a column to strings.'''
+    if field == _OPERATION_FIELD:
+        return [_OPERATION_SYMBOLS[value] for value in values]
+    return ms_to_str_many(values)
+
+
+def format_template(template, row_chunks):
+    '''Yield lists of lines formatted by a Template.'''
+    for chunk in row_chunks:
+        columns = [None] * len(chunk)
+        for field in template.fields:
+            columns[field] = format_column(field, chunk[field])
+        yield list(template.format_columns(columns, len(chunk[0])))
+
+
+def _table_fields(times):
+    # (field, is_text) pairs of table columns
+    fields = []
+    for field in range(len(_FIELD_NAMES)):
+        if field == _OPERATION_FIELD or times != TIMES_MS:
+            fields.append((field, True))
+        if field != _OPERATION_FIELD and times != TIMES_TEXT:
+            fields.append((field, False))
+    return fields
+
+
+def _field_name(field, is_text):
+    if is_text:
+        return _FIELD_NAMES[field]
+    return _FIELD_NAMES[field] + '_ms'
+
+
+def format_table(row_chunks, times=TIMES_TEXT, delimiter=','):
+    '''Yield lists of CSV or TSV lines, starting with a header.
+
+    Values never need quoting: times only consist of digits, '-',
+    ':', and '.'.
+    '''
+    fields = _table_fields(times)
+    header = delimiter.join(
+        _field_name(field, is_text) for field, is_text in fields)
+
+    is_first = True
+    for chunk in row_chunks:
+        columns = [
+            format_column(field, chunk[field]) if is_text
+            else map(str, chunk[field])
+            for field, is_text in fields]
+        lines = list(map(delimiter.join, zip(*columns)))
+        if is_first:
+            lines.insert(0, header)
+            is_first = False
+        yield lines
+
+
+def format_jsonl(row_chunks, times=TIMES_TEXT):
+    '''Yield lists of JSON Lines, one object per row.'''
+    fields = _table_fields(times)
+    # Strings need no escaping (see format_table())
+    pattern = '{{{{{}}}}}'.format(','.join(
+        '"{}":{}'.format(
+            _field_name(field, is_text),
+            '"{{{}}}"'.format(i) if is_text else '{{{}}}'.format(i))
+        for i, (field, is_text) in enumerate(fields)))
+
+    for chunk in row_chunks:
+        columns = [
+            format_column(field, chunk[field]) if is_text else chunk[field]
+            for field, is_text in fields]
+        yield list(map(pattern.format, *columns))
+
+
+def write_line_chunks(f, line_chunks):
+    '''Write lists of lines to a text file, each followed by a new line.
+
+    This is a generator that yields the number of lines written so far
+    after every chunk.
+    '''
+    num_lines = 0
+    for chunk in line_chunks:
+        chunk.append('')
+        f.write('\n'.join(chunk))
+        num_lines += len(chunk) - 1
+        yield num_lines
+
+
+def write_columns(f, columns, indices, chunk_size=CHUNK_SIZE):
+    '''Write rows to a binary file as int64 columns.
+
+    indices must be a sequence. This is a generator that yields the
+    number of rows written so far, counting every column as a quarter
+    of a row. Raises OverflowError if a time doesn't fit in 64 bits.
+    '''
+    num_columns = len(columns)
+    num_rows = len(indices)
+    f.write(_COLUMNS_HEADER.pack(
+        COLUMNS_MAGIC, COLUMNS_VERSION, num_columns, num_rows))
+
+    for column_num, values in enumerate(columns):
+        num_written = 0
+        for chunk in iter_chunks(indices, chunk_size):
+            data = array('q', map(values.__getitem__, chunk))
+            if sys.byteorder != 'little':
+                data.byteswap()
+            f.write(data.tobytes())
+            num_written += len(chunk)
+            yield (column_num * num_rows + num_written) // num_columns
+
+
+def _format_lines(export_format, row_chunks, template, times):
+    if export_format == FORMAT_TEMPLATE:
+        return format_template(template, row_chunks)
+    elif export_format == FORMAT_CSV:
+        return format_table(row_chunks, times, ',')
+    elif export_format == FORMAT_TSV:
+        return format_table(row_chunks, times, '\t')
+    elif export_format == FORMAT_JSONL:
+        return format_jsonl(row_chunks, times)
+    raise ValueError('Unknown text format {!r}'.format(export_format))
+
+
+def iter_lines(
+        export_format, columns, indices,
+        template=None, times=TIMES_TEXT, chunk_size=CHUNK_SIZE):
+    '''Return an iterator of lines of a text format.
+
+    The arguments are the same as of export().
+    '''
+    return chain.from_iterable(_format_lines(
+        export_format,
+        iter_row_chunks(columns, indices, chunk_size),
+        template,
+        times))
+
+
+def export(
+        f, export_format, columns, indices,
+        template=None, times=TIMES_TEXT, chunk_size=CHUNK_SIZE):
+    '''Return a generator that writes rows to a file.
+
+    f is a binary file if is_binary(export_format) is True, otherwise
+    a text file; the line endings of text formats are the ones of f.
+    columns is a (time1, time2, operation, result) sequence of
+    sequences of raw values, and indices is a sequence of indices of
+    the rows to export, in order. template is a Template for
+    FORMAT_TEMPLATE, and times is one of TIMES for table formats.
+
+    The generator yields the number of rows processed so far, so the
+    caller can show progress or stop writing between chunks.
+    '''
+    if export_format == FORMAT_COLUMNS:
+        return write_columns(f, columns, indices, chunk_size)
+
+    line_chunks = _format_lines(
+        export_format,
+        iter_row_chunks(columns, indices, chunk_size),
+        template,
+        times)
+    return _count_rows(
+        write_line_chunks(f, line_chunks), len(indices), chunk_size)
+
+
+def _count_rows(line_progress, num_rows, chunk_size):
+    # Every chunk of lines comes from a chunk of rows; the number of
+    # lines differs because of the header and %n
+    for num_chunks, _ in enumerate(line_progress, 1):
+        yield min(num_chunks * chunk_size, num_rows)
+
+
+def export_file(
+        path, export_format, columns, indices, line_ending='\n',
+        progress=None, cancelled=None, **kwargs):
+    '''Export rows to a file.
+
+    The rest of the arguments are the same as of export(). This can
+    run in a worker thread, provided that the columns don't change
+    meanwhile: progress is called with the number of rows written
+    after every chunk, and writing stops after the chunk in which the
+    cancelled threading.Event is set.
+
+    Returns False if cancelled. The partial file is removed if
+    cancelled or on errors (OSError or OverflowError, see export()).
+    '''
+    if is_binary(export_format):
+        f = open(path, 'wb')
+    else:
+        f = open(path, 'w', newline=line_ending)
+
+    try:
+        with f:
+            for num_rows in export(
+                    f, export_format, columns, indices, **kwargs):
+                if progress is not None:
+                    progress(num_rows)
+                if cancelled is not None and cancelled.is_set():
+                    break
+            else:
+                return True
+    except BaseException:
+        _remove(path)
+        raise
+
+    _remove(path)
+    return False
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,325 @@
+'''Import of equations from text files.
+
+The kind of a file is detected by its first line:
+
+* CSV or TSV, if the first line is a header with the fields of
+  exporting: "time_1" or "time_1_ms", "time_2" or "time_2_ms",
+  "operation", and optionally others, like "result". Times are
+  ms_to_str() strings or, in the "_ms" fields, integer milliseconds.
+* JSON Lines, if the first line starts with "{"; the objects have the
+  same fields as in CSV, so the JSON layout of notebook.json is also
+  accepted when split into lines.
+* Plain text otherwise: every line is an equation "time1 op time2",
+  optionally followed by "= result", like the default export format,
+  or a single time, which is imported as "time + 0".
+
+Times are parsed by str_to_ms(), and, like in the calculator, their
+absolute values are used. The result is always computed from the
+equation, so a result in the file is ignored. Empty lines are
+skipped; invalid lines are reported with their numbers and skipped
+too, without stopping the import.
+
+Big files are split into chunks at line boundaries, and the chunks
+are parsed in a process pool. The pool doesn't fork the calling
+process, which may have other threads, like the ones of GTK: workers
+are started by the "forkserver" method where available, and by
+"spawn" otherwise. Both import the main module of the program in
+every worker, so the main script must be guarded by
+"if __name__ == '__main__'".
+'''
+
+from collections import namedtuple
+import csv
+import json
+import multiprocessing
+import os
+import re
+
+from ..calculator.operation import Operation, calculate
+from ..time_tools import str_to_ms
+from . import storage
+
+
+# Files smaller than this are parsed without a process pool
+POOL_MIN_SIZE = 16 << 20
+# Size of a chunk parsed by a worker process
+CHUNK_SIZE = 4 << 20
+# Number of errors kept in ImportResult; the rest are only counted
+MAX_ERRORS = 1000
+
+KIND_TEXT = 'text'
+KIND_CSV = 'csv'
+KIND_JSONL = 'jsonl'
+
+ImportResult = namedtuple('ImportResult', 'columns num_errors errors')
+ImportResult.__doc__ = '''Result of import_file().
+
+columns is the list of (time1, time2, operation, result) columns,
+and errors is a list of up to MAX_ERRORS (line_num, message) tuples
+out of num_errors.
+'''
+
+_OPERATION_MAP = {
+    '+': Operation.ADD,
+    '-': Operation.SUB,
+    '\N{MINUS SIGN}': Operation.SUB,
+    }
+
+_EQUATION_RE = re.compile(
+    r'\s*(.*?)\s+([-+\N{MINUS SIGN}])\s+(.*?)\s*(?:=\s*(.*?)\s*)?')
+
+# (time1, time2, operation) fields; every time field has a string
+# and an integer variant
+_FIELD_NAMES = ('time_1', 'time_2', 'operation')
+
+
+def _make_row(time1, operation, time2):
+    time1 = abs(time1)
+    time2 = abs(time2)
+    return time1, time2, operation, calculate(time1, operation, time2)
+
+
+def _parse_operation(value):
+    if isinstance(value, str) and value.strip() in _OPERATION_MAP:
+        return _OPERATION_MAP[value.strip()]
+    raise ValueError('Invalid operation {!r}'.format(value))
+
+
+def _parse_time(value):
+    if not isinstance(value, str):
+        raise ValueError('Invalid time {!r}'.format(value))
+    return str_to_ms(value)
+
+
+def _parse_ms(value):
+    if isinstance(value, str):
+        value = int(value.strip())
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError('Invalid milliseconds {!r}'.format(value))
+    return value
+
+
+def parse_text_line(line):
+    '''Parse an equation or a single time.
+
+    Returns a (time1, time2, operation, result) row. Raises ValueError
+    if the line is invalid.
+    '''
+    match = _EQUATION_RE.fullmatch(line)
+    if match is None:
+        return _make_row(str_to_ms(line), Operation.ADD, 0)
+
+    time1, operation, time2, _result = match.groups()
+    return _make_row(
+        str_to_ms(time1), _OPERATION_MAP[operation], str_to_ms(time2))
+
+
+def _get_field_getters(names):
+    # Return a function that returns a (time1, time2, operation,
+    # result) row from a mapping of field names to values. Raises
+    # ValueError if required fields are missing.
+    names = set(names)
+    getters = []
+    for field, name in enumerate(_FIELD_NAMES):
+        if field == 2:
+            if name not in names:
+                raise ValueError('Missing field {!r}'.format(name))
+            getters.append((name, _parse_operation))
+        elif name + '_ms' in names:
+            getters.append((name + '_ms', _parse_ms))
+        elif name in names:
+            getters.append((name, _parse_time))
+        else:
+            raise ValueError('Missing field {!r}'.format(name))
+
+    def get_row(record):
+        values = []
+        for name, parse in getters:
+            if record.get(name) in (None, ''):
+                raise ValueError('Missing value of {!r}'.format(name))
+            values.append(parse(record[name]))
+        time1, time2, operation = values
+        return _make_row(time1, operation, time2)
+
+    return get_row
+
+
+def detect_kind(first_line):
+    '''Detect the kind of a file by its first line.
+
+    Returns a (kind, header, delimiter) tuple, where header is a list
+    of field names and delimiter is ',' or '\\t' for KIND_CSV, and
+    both are None otherwise. Raises ValueError if the header of a CSV
+    file lacks required fields.
+    '''
+    stripped = first_line.strip()
+    if stripped.startswith('{'):
+        return KIND_JSONL, None, None
+
+    delimiter = '\t' if '\t' in stripped else ','
+    header = next(csv.reader([stripped], delimiter=delimiter), [])
+    header = [name.strip() for name in header]
+    if any(name.startswith('time_') for name in header):
+        # Check required fields
+        _get_field_getters(header)
+        return KIND_CSV, header, delimiter
+
+    return KIND_TEXT, None, None
+
+
+def parse_lines(lines, kind, header=None, delimiter=None, first_line_num=1):
+    '''Parse lines of a file of the given kind.
+
+    header and delimiter are the ones returned by detect_kind() for
+    KIND_CSV; the header line itself must not be passed. Line numbers
+    of errors start at first_line_num.
+
+    Returns an ImportResult.
+    '''
+    columns = storage.new_columns()
+    errors = []
+    num_errors = 0
+
+    get_row = None
+    if kind == KIND_CSV:
+        get_row = _get_field_getters(header)
+
+    for line_num, line in enumerate(lines, first_line_num):
+        if not line or line.isspace():
+            continue
+
+        try:
+            if kind == KIND_TEXT:
+                row = parse_text_line(line)
+            elif kind == KIND_CSV:
+                values = next(csv.reader([line], delimiter=delimiter))
+                if len(values) != len(header):
+                    raise ValueError(
+                        'Expected {} values, got {}'.format(
+                            len(header), len(values)))
+                row = get_row(dict(zip(header, values)))
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('Not a JSON object')
+                if get_row is None:
+                    get_row = _get_field_getters(record)
+                row = get_row(record)
+        # OverflowError comes from float times, like "1e400"
+        except (ValueError, OverflowError) as e:
+            num_errors += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((line_num, str(e)))
+            continue
+
+        storage.append_row(columns, row)
+
+    return ImportResult(columns, num_errors, errors)
+
+
+def _extend_columns(columns, other):
+    for field, values in enumerate(other):
+        if isinstance(values, list) and not isinstance(columns[field], list):
+            # array.extend() may stop halfway on huge values
+            columns[field] = list(columns[field])
+        columns[field].extend(values)
+
+
+def _merge_results(chunk_results, first_line_num, cancelled):
+    # Returns None if cancelled
+    columns = storage.new_columns()
+    errors = []
+    num_errors = 0
+
+    line_num = first_line_num
+    for result, num_lines in chunk_results:
+        if cancelled is not None and cancelled.is_set():
+            return None
+        _extend_columns(columns, result.columns)
+        num_errors += result.num_errors
+        for error_line_num, message in result.errors:
+            if len(errors) == MAX_ERRORS:
+                break
+            errors.append((line_num + error_line_num - 1, message))
+        line_num += num_lines
+
+    return ImportResult(columns, num_errors, errors)
+
+
+def _chunk_bounds(path, start, size, chunk_size):
+    # Return (start, end) byte offsets of chunks ending at line ends
+    bounds = []
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _parse_chunk(task):
+    path, start, end, kind, header, delimiter = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Universal newlines, like in text mode
+    text = data.decode('utf-8', 'replace')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if start == 0:
+        text = text.lstrip('\ufeff')
+    lines = text.split('\n')
+    if lines[-1] == '':
+        del lines[-1]
+
+    return parse_lines(lines, kind, header, delimiter), len(lines)
+
+
+def _get_pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    if 'forkserver' in methods:
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def import_file(
+        path, processes=None, chunk_size=CHUNK_SIZE, cancelled=None):
+    '''Import equations from a file.
+
+    processes is the number of worker processes for big files (by
+    default, the number of CPUs). This can run in a worker thread:
+    parsing stops after the chunk in which the cancelled
+    threading.Event is set, and the worker processes are terminated.
+
+    Returns an ImportResult, or None if cancelled. Raises OSError if
+    the file cannot be read, and ValueError if it's a CSV file without
+    required fields.
+    '''
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+        size = os.fstat(f.fileno()).st_size
+
+    kind, header, delimiter = detect_kind(
+        first_line.decode('utf-8', 'replace').lstrip('\ufeff'))
+    if kind == KIND_CSV:
+        start = len(first_line)
+        first_line_num = 2
+    else:
+        start = 0
+        first_line_num = 1
+
+    tasks = [
+        (path, chunk_start, chunk_end, kind, header, delimiter)
+        for chunk_start, chunk_end in _chunk_bounds(
+            path, start, size, chunk_size)]
+
+    if size >= POOL_MIN_SIZE and len(tasks) > 1:
+        # Leaving the block terminates the workers, even if cancelled
+        with _get_pool_context().Pool(processes) as pool:
+            return _merge_results(
+                pool.imap(_parse_chunk, tasks), first_line_num, cancelled)
+
+    return _merge_results(
+        map(_parse_chunk, tasks), first_line_num, cancelled)
@@ -0,0 +1,290 @@
+'''Append-only journal of notebook changes.
+
+The journal is a binary notebook file (see storage) with a snapshot
+of the rows, followed by text records of the changes made after the
+snapshot was written. Instead of rewriting the whole notebook on
+every save, each change is appended as one JSON line as soon as it
+happens:
+
+    ["add", t1, t2, op, r]      an equation was appended
+    ["remove", i, j, ...]       rows with the given ascending indices
+                                were removed
+    ["clear"]                   all rows were removed
+
+Times are integer milliseconds. Replaying the records on top of the
+snapshot gives the current notebook; invalid lines, like the one torn
+by a crash, are skipped.
+
+Once the text records grow past COMPACT_MIN_SIZE, the journal is
+compacted in a background thread: a new snapshot is written to a
+temporary file, the records added in the meantime are appended to it,
+and it replaces the journal.
+'''
+
+import json
+import os
+import threading
+
+from ..persistence import fsync_dir
+from .columns import delete_rows
+from . import storage
+
+
+# Size of text records that triggers compaction
+COMPACT_MIN_SIZE = 1 << 20
+
+
+def _format_record(record):
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+
+def _format_add(row):
+    return b'["add",%d,%d,%d,%d]\n' % tuple(row)
+
+
+def _are_valid_indices(indices, num_rows):
+    # Whether indices are ascending, unique, and in range
+    prev = -1
+    for index in indices:
+        if (not isinstance(index, int)
+                or isinstance(index, bool)
+                or not prev < index < num_rows):
+            return False
+        prev = index
+    return True
+
+
+def replay(columns, lines):
+    '''Apply text records to (time1, time2, operation, result) columns.
+
+    columns must be a list, since a time column is replaced by a list
+    if it gets a value that doesn't fit in 64 bits (see
+    storage.append_row()). Invalid records are skipped.
+
+    Returns the number of valid records.
+    '''
+    num_records = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+
+        try:
+            kind = record[0]
+            if kind == 'add':
+                time1, time2, operation, result = record[1:]
+                if not all(isinstance(v, int)
+                           for v in (time1, time2, result)):
+                    continue
+                if operation not in (0, 1):
+                    continue
+                storage.append_row(
+                    columns, (time1, time2, operation, result))
+            elif kind == 'remove':
+                indices = record[1:]
+                if not _are_valid_indices(indices, len(columns[0])):
+                    continue
+                delete_rows(columns, indices)
+            elif kind == 'clear':
+                for values in columns:
+                    del values[:]
+            else:
+                continue
+        except (IndexError, KeyError, TypeError, ValueError):
+            continue
+
+        num_records += 1
+
+    return num_records
+
+
+class Journal:
+    '''Journal file of a notebook.
+
+    All methods must be called from the same thread, except that
+    load() can be called from a worker thread before anything else.
+    Write errors are ignored, like in other places where the state of
+    the application is saved.
+    '''
+
+    def __init__(self, path):
+        self._path = path
+        self._tmp_path = path + '.tmp'
+
+        self._file = None
+        # Size of text records after the snapshot
+        self._tail_size = 0
+
+        self._lock = threading.Lock()
+        self._thread = None
+        # Records added while the compaction thread is running
+        self._pending = None
+        # Whether load() failed to read the existing journal
+        self._unreadable = False
+
+    def load(self):
+        '''Load the snapshot, replay the records, and open the journal
+        for appending.
+
+        Returns the list of (time1, time2, operation, result) columns,
+        or None if the journal doesn't exist. Raises OSError or
+        ValueError if it exists but cannot be read; compact() then
+        does nothing rather than overwrite it, until move_aside().
+        '''
+        try:
+            columns, tail = storage.load(self._path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._unreadable = True
+            raise
+
+        replay(columns, tail.decode('utf-8', 'replace').splitlines())
+
+        self._open(len(tail))
+        if tail and not tail.endswith(b'\n'):
+            # Terminate the line torn by a crash, so that it doesn't
+            # take the next record with it
+            self._write(b'\n')
+
+        return columns
+
+    def move_aside(self):
+        '''Rename the journal, so that a new one can be created.
+
+        This keeps a journal that load() can't read for recovery.
+        Returns the new path. Raises OSError on errors.
+        '''
+        self._wait()
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+        path = self._path + '.bad'
+        os.replace(self._path, path)
+        self._unreadable = False
+        return path
+
+    def _open(self, tail_size):
+        try:
+            self._file = open(self._path, 'ab')
+        except OSError:
+            self._file = None
+        self._tail_size = tail_size
+
+    def _write(self, data):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(data)
+
+            if self._file is None:
+                return
+            try:
+                self._file.write(data)
+                self._file.flush()
+            except OSError:
+                return
+            self._tail_size += len(data)
+
+    def add(self, row):
+        '''Record appending a (time1, time2, operation, result) row.'''
+        self._write(_format_add(row))
+
+    def remove(self, indices):
+        '''Record removing rows with the given ascending indices.'''
+        self._write(_format_record(['remove'] + list(indices)))
+
+    def clear(self):
+        '''Record removing all rows.'''
+        self._write(_format_record(['clear']))
+
+    def needs_compaction(self):
+        '''Check if the text records are big enough to compact.'''
+        return (
+            not self._is_compacting()
+            and self._tail_size >= COMPACT_MIN_SIZE)
+
+    def compact(self, columns, wait=False):
+        '''Rewrite the journal as a snapshot of the given rows.
+
+        columns is a sequence of (time1, time2, operation, result)
+        value sequences that must describe the same rows as the
+        journal. They are copied, so the caller is free to change them
+        after the call. This is also how a new journal is created.
+
+        Compaction runs in a background thread unless wait is True.
+        '''
+        if self._unreadable:
+            return
+        self._wait()
+
+        columns = [values[:] for values in columns]
+        self._pending = []
+
+        if wait:
+            self._compact(columns)
+        else:
+            self._thread = threading.Thread(
+                target=self._compact, args=(columns, ), daemon=True)
+            self._thread.start()
+
+    def _is_compacting(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _compact(self, columns):
+        # Rows with times that don't fit in the snapshot are kept as
+        # text records
+        num_rows = storage.count_int64_rows(columns)
+        try:
+            snapshot = storage.pack(
+                [values[:num_rows] for values in columns])
+            records = b''.join(
+                map(_format_add, zip(*(values[num_rows:]
+                                       for values in columns))))
+
+            with open(self._tmp_path, 'wb') as f:
+                f.write(snapshot)
+                f.write(records)
+                with self._lock:
+                    f.writelines(self._pending)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    tail_size = f.tell() - len(snapshot)
+
+                    if self._file is not None:
+                        self._file.close()
+                    os.replace(self._tmp_path, self._path)
+                    self._open(tail_size)
+            fsync_dir(os.path.dirname(os.path.abspath(self._path)))
+        except OSError:
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
+
+            with self._lock:
+                if self._file is not None and self._file.closed:
+                    self._open(self._tail_size)
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def close(self):
+        '''Wait for compaction to finish and close the journal.'''
+        self._wait()
+
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
@@ -1,33 +1,50 @@
 
+from contextlib import contextmanager
 from gettext import gettext as _, ngettext
-import json
-from collections import OrderedDict
 import os
+import threading
+import traceback
 
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GLib, GObject, Pango
 
-from ..config import CONFIG_DIR
-from ..common import confirmation
-from ..time_tools import ms_to_str, str_to_ms
-from ..calculator import Operation
-from .equation_list import EquationStore, EquationList
-from .export import ExportDialog
+from ..config import CONFIG_DIR, ensure_config_dir
+from ..common import confirmation, WIDGET_SPACING
+from ..time_tools import str_to_ms
+from .equation_list import (
+    EquationStore, EquationList, OPERATION_SYMBOLS, format_time)
+from .aggregates import RangeAggregates
+from .columns import index_ranges
+from .importing import import_file
+from .journal import Journal
+from .search import RowFilter
+from . import storage
 
 
 class Notebook(Gtk.Grid):
 
-    _OPERATION_MAP = {
-        '+': Operation.ADD,
-        '-': Operation.SUB
-        }
+    _JOURNAL_FILE = os.path.join(CONFIG_DIR, 'notebook.journal')
+    # Used before the journal; only read to migrate old notebooks
+    _JSON_FILE = os.path.join(CONFIG_DIR, 'notebook.json')
 
-    _FILE = os.path.join(CONFIG_DIR, 'notebook.json')
+    # Delay in milliseconds before the filter is applied after typing
+    _FILTER_DELAY = 150
+    # Number of import errors listed in the message
+    _MAX_SHOWN_ERRORS = 10
 
     def __init__(self, calc):
         super().__init__(
             orientation=Gtk.Orientation.VERTICAL,
             )
         self._calc = calc
+        self._journal = Journal(self._JOURNAL_FILE)
+
+        self._loading = False
+        self._load_thread = None
+        # threading.Event that cancels an unfinished import
+        self._import_cancelled = None
+        self._aggregates_source_id = 0
+        self._filter_source_id = 0
+        self._import_folder = None
 
         self._eq_store = EquationStore()
         self._eq_list = EquationList(self._eq_store)
@@ -40,6 +57,11 @@ class Notebook(Gtk.Grid):
         selection.set_mode(Gtk.SelectionMode.MULTIPLE)
         selection.connect('changed', self._on_selection_changed)
 
+        self._row_filter = RowFilter(self._get_columns)
+        # Gtk.TreeModelFilter of the store while the filter is active
+        self._filter_model = None
+        self._create_filter_bar()
+
         scrolled = Gtk.ScrolledWindow(
             shadow_type=Gtk.ShadowType.IN,
             expand=True,
@@ -47,8 +69,58 @@ class Notebook(Gtk.Grid):
         scrolled.add(self._eq_list)
         self.add(scrolled)
 
+        # Results of the selected equations
+        self._result_aggregates = RangeAggregates(
+            lambda: self._eq_store.get_sorted_column(
+                EquationStore.COL_RESULT))
+        self._aggregates_label = Gtk.Label(
+            xalign=0.0,
+            selectable=True,
+            ellipsize=Pango.EllipsizeMode.END,
+            margin_start=WIDGET_SPACING // 2,
+            margin_end=WIDGET_SPACING // 2,
+            margin_top=WIDGET_SPACING // 4,
+            margin_bottom=WIDGET_SPACING // 4,
+            no_show_all=True,
+            )
+        self.add(self._aggregates_label)
+
         self._create_toolbar()
 
+    def _create_filter_bar(self):
+        box = Gtk.Box(spacing=WIDGET_SPACING // 2)
+
+        self._search_entry = Gtk.SearchEntry(
+            placeholder_text=_('Search'),
+            hexpand=True,
+            )
+        self._search_entry.connect(
+            'search-changed', self._on_filter_changed)
+        box.add(self._search_entry)
+
+        box.add(Gtk.Label(label=_('Result from')))
+        self._min_result_entry = Gtk.Entry(
+            width_chars=12,
+            placeholder_text='00:00:00.000',
+            )
+        self._min_result_entry.connect('changed', self._on_filter_changed)
+        box.add(self._min_result_entry)
+
+        box.add(Gtk.Label(label=_('to')))
+        self._max_result_entry = Gtk.Entry(
+            width_chars=12,
+            placeholder_text='00:00:00.000',
+            )
+        self._max_result_entry.connect('changed', self._on_filter_changed)
+        box.add(self._max_result_entry)
+
+        self._filter_bar = Gtk.SearchBar(show_close_button=True)
+        self._filter_bar.add(box)
+        self._filter_bar.connect_entry(self._search_entry)
+        self._filter_bar.connect(
+            'notify::search-mode-enabled', self._on_filter_changed)
+        self.add(self._filter_bar)
+
     def _create_toolbar(self):
         toolbar = Gtk.Toolbar(
             hexpand=True
@@ -96,27 +168,102 @@ class Notebook(Gtk.Grid):
         self._btn_save_as = btn_save_as
         toolbar.add(btn_save_as)
 
+        btn_import = Gtk.ToolButton(
+            label=_('Import…'),
+            icon_name='document-open',
+            tooltip_text=_('Import equations from a file'),
+            )
+        btn_import.connect('clicked', self._on_import)
+        self._btn_import = btn_import
+        toolbar.add(btn_import)
+
+        toolbar.add(Gtk.SeparatorToolItem.new())
+
+        btn_find = Gtk.ToggleToolButton(
+            label=_('Find'),
+            icon_name='edit-find',
+            tooltip_text=_('Filter equations'),
+            )
+        self._filter_bar.bind_property(
+            'search-mode-enabled', btn_find, 'active',
+            GObject.BindingFlags.BIDIRECTIONAL)
+        toolbar.add(btn_find)
+
+        self._btn_add = btn_add
+
+        # Shown while the notebook is being loaded
+        loading_item = Gtk.ToolItem(no_show_all=True)
+        loading_box = Gtk.Box(
+            spacing=WIDGET_SPACING // 2,
+            margin_start=WIDGET_SPACING,
+            )
+        self._loading_spinner = Gtk.Spinner()
+        loading_box.add(self._loading_spinner)
+        loading_box.add(Gtk.Label(label=_('Loading…')))
+        loading_box.show_all()
+        loading_item.add(loading_box)
+        self._loading_item = loading_item
+        toolbar.add(loading_item)
+
     def _update_button_state(self):
-        has_eqs = len(self._eq_store) > 0
+        has_eqs = len(self._eq_store) > 0 and not self._loading
+        self._btn_add.set_sensitive(not self._loading)
+        self._btn_import.set_sensitive(not self._loading)
         self._btn_clear.set_sensitive(has_eqs)
         self._btn_save_as.set_sensitive(has_eqs)
+        self._on_selection_changed(self._eq_list.get_selection())
+
+    def _get_columns(self):
+        return tuple(
+            self._eq_store.get_column(column)
+            for column in (
+                EquationStore.COL_TIME1,
+                EquationStore.COL_TIME2,
+                EquationStore.COL_OPERATION,
+                EquationStore.COL_RESULT))
+
+    def _get_listed_indices(self):
+        # Indices of the rows shown in the list, in the order of the list
+        order = self._eq_store.get_order()
+        if self._filter_model is None:
+            return order
+        return self._row_filter.filter_indices(order)
+
+    def _compact_journal_if_needed(self):
+        if self._journal.needs_compaction():
+            self._journal.compact(self._get_columns())
 
     def _on_add(self, widget):
-        tree_iter = self._eq_store.append((
+        if self._loading:
+            return
+
+        row = (
             self._calc.time1,
             self._calc.time2,
             self._calc.operation,
-            self._calc.result))
-
-        tree_path = self._eq_store.get_path(tree_iter)
-        self._eq_list.scroll_to_cell(tree_path, None, False, 0.0, 0.0)
-        self._eq_list.set_cursor(tree_path, None, False)
+            self._calc.result)
+        tree_iter = self._eq_store.append(row)
+        store_path = self._eq_store.get_path(tree_iter)
+        self._result_aggregates.insert(
+            store_path.get_indices()[0], row[EquationStore.COL_RESULT])
+        self._journal.add(row)
+        self._compact_journal_if_needed()
+
+        tree_path = self._to_view_path(store_path)
+        if tree_path is not None:
+            self._eq_list.scroll_to_cell(tree_path, None, False, 0.0, 0.0)
+            self._eq_list.set_cursor(tree_path, None, False)
 
         self._update_button_state()
 
     def _on_remove(self, widget):
+        if self._loading:
+            return
+
         selection = self._eq_list.get_selection()
-        tree_paths = selection.get_selected_rows()[1]
+        tree_paths = [
+            self._to_store_path(tree_path)
+            for tree_path in selection.get_selected_rows()[1]]
         num = len(tree_paths)
         if tree_paths and confirmation(
                 self.get_toplevel(),
@@ -126,25 +273,177 @@ class Notebook(Gtk.Grid):
                     num).format(num=num),
                 None,
                 _('_Remove')):
-            self._eq_store.remove_equations(tree_paths)
+            if 2 * num >= len(self._eq_store):
+                # Rebuilding the view is faster than removing most of
+                # its rows one by one
+                with self._detach_store():
+                    indices = self._eq_store.remove_equations(tree_paths)
+            else:
+                indices = self._eq_store.remove_equations(tree_paths)
+            self._result_aggregates.invalidate()
+            self._row_filter.invalidate()
+            self._journal.remove(indices)
+            self._compact_journal_if_needed()
             self._update_button_state()
 
     def _on_clear(self, widget):
+        if self._loading:
+            return
+
         if not confirmation(
                 self.get_toplevel(),
                 _('Clear the list?'),
                 _('All equations will be removed.'),
                 _('_Clear')):
             return
-        self._eq_store.clear()
+        with self._detach_store():
+            self._eq_store.clear()
+        self._result_aggregates.invalidate()
+        self._journal.clear()
+        self._compact_journal_if_needed()
         self._update_button_state()
 
     def _on_save_as(self, widget):
+        from .export import ExportDialog
+
         export_dlg = ExportDialog(
-            self.get_toplevel(), self._eq_list.get_selection())
+            self.get_toplevel(),
+            self._eq_list.get_selection(),
+            self._get_columns(),
+            self._get_listed_indices)
         export_dlg.run()
         export_dlg.destroy()
 
+    def _on_import(self, widget):
+        if self._loading:
+            return
+
+        open_dlg = Gtk.FileChooserDialog(
+            title=_('Import equations'),
+            action=Gtk.FileChooserAction.OPEN,
+            transient_for=self.get_toplevel(),
+            destroy_with_parent=True
+            )
+        open_dlg.add_buttons(
+            _('_Cancel'), Gtk.ResponseType.CANCEL,
+            _('_Import'), Gtk.ResponseType.OK,
+            )
+        for name, patterns in (
+                (_('Supported files'), ('*.txt', '*.csv', '*.tsv', '*.jsonl')),
+                (_('All files'), ('*', ))):
+            file_filter = Gtk.FileFilter()
+            file_filter.set_name(name)
+            for pattern in patterns:
+                file_filter.add_pattern(pattern)
+            open_dlg.add_filter(file_filter)
+        open_dlg.set_current_folder(
+            self._import_folder or os.path.expanduser('~'))
+
+        path = None
+        if open_dlg.run() == Gtk.ResponseType.OK:
+            path = open_dlg.get_filename()
+            self._import_folder = open_dlg.get_current_folder()
+        open_dlg.destroy()
+        if path is None:
+            return
+
+        # Like loading, importing blocks changes until it's finished,
+        # so the rows are appended to the notebook as it was
+        self._set_loading(True)
+        self._import_cancelled = threading.Event()
+        self._load_thread = threading.Thread(
+            target=self._import_worker,
+            args=(path, self._import_cancelled),
+            daemon=True)
+        self._load_thread.start()
+
+    def _import_worker(self, path, cancelled):
+        # The callback must always run, or the notebook would stay
+        # locked; an exception is passed to it instead of the result
+        try:
+            result = import_file(path, cancelled=cancelled)
+        except Exception as e:
+            if not isinstance(e, (OSError, ValueError)):
+                traceback.print_exc()
+            result = e
+        GLib.idle_add(self._on_import_finished, path, result)
+
+    def _on_import_finished(self, path, result):
+        if self._load_thread is None:
+            # save_state() was called in the meantime
+            return GLib.SOURCE_REMOVE
+
+        self._load_thread.join()
+        self._load_thread = None
+        self._import_cancelled = None
+
+        error = None
+        if isinstance(result, OSError):
+            error = result.strerror or str(result)
+        elif isinstance(result, Exception):
+            error = str(result) or type(result).__name__
+        elif result is not None:
+            try:
+                with self._detach_store():
+                    self._eq_store.extend_columns(result.columns)
+            except OverflowError:
+                error = _('Some times are too large.')
+            else:
+                self._result_aggregates.invalidate()
+                self._row_filter.invalidate()
+                # Compaction writes all rows at once, which is faster
+                # than journaling imported rows one by one
+                self._journal.compact(self._get_columns())
+
+        self._set_loading(False)
+
+        if error is not None:
+            self._show_message(
+                Gtk.MessageType.ERROR,
+                _('Can\'t import equations'),
+                '{}\n\n{}'.format(path, error))
+        elif result is not None:
+            self._show_import_result(result)
+
+        return GLib.SOURCE_REMOVE
+
+    def _show_import_result(self, result):
+        num_imported = len(result.columns[0])
+        text = ngettext(
+            'Imported {num} equation',
+            'Imported {num} equations',
+            num_imported).format(num=num_imported)
+        if not result.num_errors:
+            self._show_message(Gtk.MessageType.INFO, text, None)
+            return
+
+        lines = [
+            ngettext(
+                '{num} line was skipped:',
+                '{num} lines were skipped:',
+                result.num_errors).format(num=result.num_errors)]
+        for line_num, message in result.errors[:self._MAX_SHOWN_ERRORS]:
+            lines.append(
+                _('Line {line_num}: {message}').format(
+                    line_num=line_num, message=message))
+        if result.num_errors > self._MAX_SHOWN_ERRORS:
+            lines.append('…')
+        self._show_message(Gtk.MessageType.WARNING, text, '\n'.join(lines))
+
+    def _show_message(self, message_type, text, secondary_text):
+        message_dlg = Gtk.MessageDialog(
+            message_type=message_type,
+            text=text,
+            secondary_text=secondary_text,
+            transient_for=self.get_toplevel(),
+            destroy_with_parent=True
+            )
+        message_dlg.add_buttons(
+            _('_OK'), Gtk.ResponseType.OK,
+            )
+        message_dlg.run()
+        message_dlg.destroy()
+
     def _on_query_tooltip(self, eq_list, x, y, keyboard_tip, tooltip):
         points_to_row, *context = eq_list.get_tooltip_context(
             x, y, keyboard_tip)
@@ -155,10 +454,10 @@ class Notebook(Gtk.Grid):
         row = eq_store[tree_iter]
 
         text = '{} {} {} = {}'.format(
-            ms_to_str(row[EquationStore.COL_TIME1], True),
-            ('+', '\N{MINUS SIGN}')[row[EquationStore.COL_OPERATION]],
-            ms_to_str(row[EquationStore.COL_TIME2], True),
-            ms_to_str(row[EquationStore.COL_RESULT], True)
+            format_time(row[EquationStore.COL_TIME1]),
+            OPERATION_SYMBOLS[row[EquationStore.COL_OPERATION]],
+            format_time(row[EquationStore.COL_TIME2]),
+            format_time(row[EquationStore.COL_RESULT])
             )
 
         tooltip.set_text(text)
@@ -219,12 +518,23 @@ class Notebook(Gtk.Grid):
         mi_save_as.connect('activate', self._on_save_as)
         menu.append(mi_save_as)
 
+        mi_import = Gtk.MenuItem(
+            label=_('_Import…'),
+            use_underline=True,
+            tooltip_text=_('Import equations from a file'),
+            )
+        mi_import.connect('activate', self._on_import)
+        menu.append(mi_import)
+
         num_selected = selection.count_selected_rows()
-        if num_selected == 0:
+        if num_selected == 0 or self._loading:
             mi_remove.set_sensitive(False)
-        if len(self._eq_store) == 0:
+        if len(self._eq_store) == 0 or self._loading:
             mi_clear.set_sensitive(False)
             mi_save_as.set_sensitive(False)
+        if self._loading:
+            mi_add.set_sensitive(False)
+            mi_import.set_sensitive(False)
 
         menu.show_all()
         menu.popup(None, None, None, None, event.button, event.time)
@@ -239,43 +549,224 @@ class Notebook(Gtk.Grid):
         self._calc.time2 = row[EquationStore.COL_TIME2]
 
     def _on_selection_changed(self, selection):
-        self._btn_remove.set_sensitive(selection.count_selected_rows() > 0)
-
-    def save_state(self):
-        notebook = []
-        for row in self._eq_store:
-            notebook.append(OrderedDict((
-                ('time_1', ms_to_str(row[EquationStore.COL_TIME1])),
-                ('time_2', ms_to_str(row[EquationStore.COL_TIME2])),
-                ('operation', ('+', '-')[row[EquationStore.COL_OPERATION]]),
-                ('result', ms_to_str(row[EquationStore.COL_RESULT]))
-                )))
+        self._btn_remove.set_sensitive(
+            selection.count_selected_rows() > 0 and not self._loading)
+
+        # Rubber banding changes the selection many times in a row
+        if not self._aggregates_source_id:
+            self._aggregates_source_id = GLib.idle_add(
+                self._update_aggregates)
+
+    def _update_aggregates(self):
+        self._aggregates_source_id = 0
+
+        tree_paths = self._eq_list.get_selection().get_selected_rows()[1]
+        if not tree_paths:
+            self._aggregates_label.hide()
+            return GLib.SOURCE_REMOVE
+
+        count, total, min_result, max_result = self._result_aggregates.query(
+            index_ranges(self._to_store_path(tree_path).get_indices()[0]
+                         for tree_path in tree_paths))
+        self._aggregates_label.set_text(
+            _('Selected: {count}   Sum: {sum}   '
+              'Min: {min}   Max: {max}').format(
+                count=count,
+                sum=format_time(total),
+                min=format_time(min_result),
+                max=format_time(max_result)))
+        self._aggregates_label.show()
+        return GLib.SOURCE_REMOVE
+
+    def _on_filter_changed(self, *args):
+        # Don't filter on every keystroke
+        if self._filter_source_id:
+            GLib.source_remove(self._filter_source_id)
+        self._filter_source_id = GLib.timeout_add(
+            self._FILTER_DELAY, self._apply_filter)
+
+    def _parse_result_entry(self, entry):
+        text = entry.get_text().strip()
+        style_context = entry.get_style_context()
+        style_context.remove_class(Gtk.STYLE_CLASS_ERROR)
+        if not text:
+            return None
 
         try:
-            with open(self._FILE, 'w', encoding='utf-8') as f:
-                json.dump(notebook, f, ensure_ascii=False, indent=2)
-        except OSError:
-            pass
-
-    def load_state(self):
+            return str_to_ms(text)
+        except ValueError:
+            style_context.add_class(Gtk.STYLE_CLASS_ERROR)
+            return None
+
+    def _apply_filter(self):
+        self._filter_source_id = 0
+
+        if self._filter_bar.get_search_mode():
+            self._row_filter.set_criteria(
+                self._search_entry.get_text().strip(),
+                self._parse_result_entry(self._min_result_entry),
+                self._parse_result_entry(self._max_result_entry))
+        else:
+            self._row_filter.set_criteria()
+
+        if self._row_filter.is_active or self._filter_model is not None:
+            self._eq_list.set_model(None)
+            self._set_view_model()
+        return GLib.SOURCE_REMOVE
+
+    def _set_view_model(self):
+        if self._row_filter.is_active:
+            self._filter_model = Gtk.TreeModelFilter(
+                child_model=self._eq_store)
+            self._filter_model.set_visible_func(self._is_row_visible)
+            self._eq_list.set_model(self._filter_model)
+        else:
+            self._filter_model = None
+            self._eq_list.set_model(self._eq_store)
+
+    def _is_row_visible(self, eq_store, tree_iter, data):
+        return self._row_filter.is_visible(eq_store.get_index(tree_iter))
+
+    @contextmanager
+    def _detach_store(self):
+        '''Context manager for bulk changes of the store.
+
+        The view is detached from the model, so it rebuilds its rows
+        once when the model is attached back, instead of handling every
+        change. The filter model is dropped as well, and is then
+        rebuilt instead of following every change.
+        '''
+        self._eq_list.set_model(None)
+        self._filter_model = None
         try:
-            with open(self._FILE, 'r', encoding='utf-8') as f:
-                notebook = json.load(f)
-        except (OSError, ValueError):
-            return
+            yield
+        finally:
+            self._row_filter.invalidate()
+            self._set_view_model()
+
+    def _to_store_path(self, tree_path):
+        if self._filter_model is None:
+            return tree_path
+        return self._filter_model.convert_path_to_child_path(tree_path)
+
+    def _to_view_path(self, tree_path):
+        '''Return None if the row is hidden by the filter.'''
+        if self._filter_model is None:
+            return tree_path
+        return self._filter_model.convert_child_path_to_path(tree_path)
 
-        if not isinstance(notebook, list):
-            return
+    def save_state(self):
+        # Changes are written to the journal as they happen, so there
+        # is nothing to save except finishing the background work. An
+        # import is canceled; its rows are not in the journal yet.
+        if self._import_cancelled is not None:
+            self._import_cancelled.set()
+            self._import_cancelled = None
+        if self._load_thread is not None:
+            self._load_thread.join()
+            self._load_thread = None
+
+        self._journal.close()
 
-        for eq in notebook:
+    def load_state(self):
+        '''Start loading the notebook.
+
+        The file is read and parsed in a worker thread, so the window
+        stays responsive, and the rows are then inserted in bulk with
+        the view detached. The notebook can't be changed until loading
+        is finished.
+        '''
+        self._set_loading(True)
+        self._load_thread = threading.Thread(
+            target=self._load_worker, daemon=True)
+        self._load_thread.start()
+
+    def _set_loading(self, loading):
+        self._loading = loading
+        self._loading_item.set_visible(loading)
+        if loading:
+            self._loading_spinner.start()
+        else:
+            self._loading_spinner.stop()
+        self._update_button_state()
+
+    def _load_worker(self):
+        # The callback must always run, or the notebook would stay
+        # locked
+        error = None
+        try:
+            columns = self._journal.load()
+        except Exception as e:
+            if not isinstance(e, (OSError, ValueError)):
+                traceback.print_exc()
+            error = self._set_journal_aside(e)
+            columns = None
+            # Don't migrate the outdated notebook.json
+            is_new_journal = error[1] is not None
+        else:
+            is_new_journal = columns is None
+            if is_new_journal:
+                try:
+                    columns = storage.load_json(self._JSON_FILE)
+                except (OSError, ValueError):
+                    columns = None
+
+        if columns is None:
+            columns = storage.new_columns()
+        GLib.idle_add(
+            self._on_load_finished, columns, is_new_journal, error)
+
+    def _set_journal_aside(self, error):
+        # Move away the journal that can't be read, so that a new one
+        # is created instead of overwriting it. Returns a (message,
+        # new_path) tuple; new_path is None if the journal can't be
+        # moved, and the changes are then not saved.
+        if isinstance(error, OSError):
+            message = error.strerror or str(error)
+        else:
+            message = str(error) or type(error).__name__
+        try:
+            new_path = self._journal.move_aside()
+        except OSError:
+            new_path = None
+        return message, new_path
+
+    def _on_load_finished(self, columns, is_new_journal, error):
+        if self._load_thread is None:
+            # save_state() was called in the meantime
+            return GLib.SOURCE_REMOVE
+
+        self._load_thread.join()
+        self._load_thread = None
+
+        with self._detach_store():
+            self._eq_store.extend_columns(columns)
+
+        self._finish_loading(is_new_journal)
+
+        if error is not None:
+            message, new_path = error
+            if new_path is not None:
+                details = _('The file was renamed to {}.').format(new_path)
+            else:
+                details = _('Changes to the notebook will not be saved.')
+            self._show_message(
+                Gtk.MessageType.ERROR,
+                _('Can\'t read the notebook'),
+                '{}\n\n{}\n\n{}'.format(
+                    self._JOURNAL_FILE, message, details))
+
+        return GLib.SOURCE_REMOVE
+
+    def _finish_loading(self, is_new_journal):
+        if is_new_journal:
             try:
-                self._eq_store.append((
-                    str_to_ms(eq['time_1']),
-                    str_to_ms(eq['time_2']),
-                    self._OPERATION_MAP[eq['operation']],
-                    str_to_ms(eq['result']),
-                    ))
-            except (KeyError, TypeError, ValueError):
+                ensure_config_dir()
+            except OSError:
                 pass
+            else:
+                self._journal.compact(self._get_columns())
+        else:
+            self._compact_journal_if_needed()
 
-        self._update_button_state()
+        self._set_loading(False)
@@ -0,0 +1,212 @@
+'''Searching and filtering of equations.
+
+Every query is answered from indexes that are built once and then
+follow appended rows:
+
+* ResultIndex keeps results sorted, so a range of results is found
+  with bisection.
+* TextIndex keeps all equations formatted as one string, so
+  a substring is found by str.find() instead of formatting every
+  equation again.
+'''
+
+from bisect import bisect_left, bisect_right
+from itertools import compress
+
+from ..time_tools import ms_to_str_many
+
+
+_OPERATION_SYMBOLS = ('+', '-')
+
+_QUERY_TRANS = str.maketrans('\N{MINUS SIGN}\N{RATIO}', '-:')
+
+
+def normalize_query(text):
+    '''Convert Unicode symbols of a query to their ASCII versions.'''
+    return text.translate(_QUERY_TRANS)
+
+
+class ResultIndex:
+    '''Row indices ordered by results.'''
+
+    def __init__(self, results):
+        self._order = sorted(range(len(results)), key=results.__getitem__)
+        self._keys = [results[i] for i in self._order]
+
+    def __len__(self):
+        return len(self._order)
+
+    def append(self, result):
+        '''Add the result of a row appended to the column.'''
+        pos = bisect_right(self._keys, result)
+        self._keys.insert(pos, result)
+        self._order.insert(pos, len(self._order))
+
+    def find(self, min_result=None, max_result=None):
+        '''Return indices of rows with results in [min, max].
+
+        None means no limit. The indices are in order of results.
+        '''
+        start = 0
+        if min_result is not None:
+            start = bisect_left(self._keys, min_result)
+        stop = len(self._keys)
+        if max_result is not None:
+            stop = bisect_right(self._keys, max_result)
+        return self._order[start:stop]
+
+
+def format_equations(columns, start=0):
+    '''Format equations from the start row as lines of text.
+
+    Times are in ms_to_str() format, and the operation is + or -.
+    '''
+    time1, time2, operations, results = columns
+    return [
+        '{} {} {} = {}\n'.format(
+            time1_str, _OPERATION_SYMBOLS[operation], time2_str, result_str)
+        for time1_str, operation, time2_str, result_str in zip(
+            ms_to_str_many(time1[start:]),
+            operations[start:],
+            ms_to_str_many(time2[start:]),
+            ms_to_str_many(results[start:]))
+        ]
+
+
+class TextIndex:
+    '''Formatted equations for substring search.'''
+
+    def __init__(self, columns):
+        self._text = ''
+        self._line_starts = []
+        self.extend(columns, 0)
+
+    def __len__(self):
+        return len(self._line_starts)
+
+    def extend(self, columns, start):
+        '''Add rows appended to the columns since the start row.'''
+        lines = format_equations(columns, start)
+        pos = len(self._text)
+        for line in lines:
+            self._line_starts.append(pos)
+            pos += len(line)
+        self._text += ''.join(lines)
+
+    def find(self, query):
+        '''Return ascending indices of rows that contain the query.'''
+        if not query:
+            return list(range(len(self._line_starts)))
+        if '\n' in query:
+            return []
+
+        text = self._text
+        line_starts = self._line_starts
+        indices = []
+        pos = text.find(query)
+        while pos != -1:
+            index = bisect_right(line_starts, pos) - 1
+            indices.append(index)
+            if index + 1 == len(line_starts):
+                break
+            pos = text.find(query, line_starts[index + 1])
+
+        return indices
+
+
+class RowFilter:
+    '''Visibility of rows for a search query and a range of results.
+
+    get_columns is a function that returns the current
+    (time1, time2, operation, result) columns. Appended rows are
+    picked up by the indexes automatically; call invalidate() after
+    any other change of the columns.
+    '''
+
+    def __init__(self, get_columns):
+        self._get_columns = get_columns
+        self._query = ''
+        self._min_result = None
+        self._max_result = None
+
+        self._result_index = None
+        self._text_index = None
+        self._mask = None
+
+    @property
+    def is_active(self):
+        return bool(
+            self._query
+            or self._min_result is not None
+            or self._max_result is not None)
+
+    def set_criteria(self, query='', min_result=None, max_result=None):
+        '''Set the query and the (inclusive) range of results.
+
+        None means no limit.
+        '''
+        self._query = normalize_query(query)
+        self._min_result = min_result
+        self._max_result = max_result
+        self._mask = None
+
+    def invalidate(self):
+        self._result_index = None
+        self._text_index = None
+        self._mask = None
+
+    def _update_indexes(self):
+        columns = self._get_columns()
+        num_rows = len(columns[0])
+
+        if self._min_result is not None or self._max_result is not None:
+            results = columns[3]
+            index = self._result_index
+            if index is None or len(index) > num_rows:
+                self._result_index = ResultIndex(results)
+            else:
+                for i in range(len(index), num_rows):
+                    index.append(results[i])
+
+        if self._query:
+            index = self._text_index
+            if index is None or len(index) > num_rows:
+                self._text_index = TextIndex(columns)
+            elif len(index) < num_rows:
+                index.extend(columns, len(index))
+
+        return num_rows
+
+    def _update_mask(self):
+        num_rows = self._update_indexes()
+        mask = None
+
+        if self._min_result is not None or self._max_result is not None:
+            mask = bytearray(num_rows)
+            for i in self._result_index.find(
+                    self._min_result, self._max_result):
+                mask[i] = 1
+
+        if self._query:
+            text_mask = bytearray(num_rows)
+            for i in self._text_index.find(self._query):
+                if mask is None or mask[i]:
+                    text_mask[i] = 1
+            mask = text_mask
+
+        if mask is None:
+            mask = bytearray(b'\1') * num_rows
+        self._mask = mask
+
+    def is_visible(self, index):
+        '''Check if the row with the given index matches.'''
+        if self._mask is None or index >= len(self._mask):
+            self._update_mask()
+        return index < len(self._mask) and bool(self._mask[index])
+
+    def filter_indices(self, indices):
+        '''Return a list of the visible indices, keeping their order.'''
+        if self._mask is None or len(self._mask) < len(indices):
+            self._update_mask()
+        mask = self._mask
+        return list(compress(indices, map(mask.__getitem__, indices)))
@@ -0,0 +1,78 @@
+'''Sort orders of EquationStore rows.
+
+A sort order is an array('q') of row indices: the index of the row
+shown at every position. Rows are sorted by the raw integer values of
+a column, which Python compares in C, so neither formatted strings
+nor a comparison callback are involved. Rows with equal values keep
+the order of insertion when sorted ascending, and the reverse one
+when sorted descending, so a descending order is just the ascending
+one reversed.
+'''
+
+from array import array
+from itertools import accumulate
+
+
+def sorted_indices(values):
+    '''Return indices of values in ascending order of the values.'''
+    # Getting items of a list is faster than boxing them from an array
+    if isinstance(values, array):
+        values = values.tolist()
+    return array('q', sorted(range(len(values)), key=values.__getitem__))
+
+
+def insert_position(values, order, value, descending=False):
+    '''Return the position of a new row in a sort order.
+
+    The new row must have the largest index, i.e. it was just
+    appended to the values.
+    '''
+    lo = 0
+    hi = len(order)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_value = values[order[mid]]
+        if descending:
+            go_left = mid_value <= value
+        else:
+            go_left = value < mid_value
+        if go_left:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def remove_indices(order, indices):
+    '''Return the order without rows with the given indices.
+
+    The indices of the remaining rows are shifted like in the columns
+    from which the rows are deleted.
+    '''
+    kept = bytearray(b'\1') * len(order)
+    for index in indices:
+        kept[index] = 0
+
+    # Number of kept rows up to every index, inclusive
+    num_kept = list(accumulate(kept))
+    return array(
+        'q', [num_kept[index] - 1 for index in order.tolist() if kept[index]])
+
+
+def reorder_map(old_order, new_order, num_rows):
+    '''Return the new_order argument of Gtk.TreeModel.rows_reordered().
+
+    This is the old position of the row at every new position. None
+    stands for the order of insertion.
+    '''
+    if old_order is None:
+        if new_order is None:
+            return list(range(num_rows))
+        return new_order.tolist()
+
+    old_positions = [0] * num_rows
+    for position, index in enumerate(old_order.tolist()):
+        old_positions[index] = position
+    if new_order is None:
+        return old_positions
+    return [old_positions[index] for index in new_order.tolist()]
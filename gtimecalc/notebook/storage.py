@@ -0,0 +1,298 @@
+'''Notebook file formats.
+
+The binary format starts with a 24-byte header:
+
+    magic       8 bytes, b'GTCNOTE\\0'
+    version     uint32, currently 1
+    reserved    uint32, 0
+    num_rows    uint64
+
+followed by num_rows records of four int64 values: time1, time2,
+operation, and result. All numbers are little-endian. Anything after
+the records is returned by load() as the tail; the journal keeps its
+text records there.
+
+Loading maps the file into memory and copies the records to arrays
+in one pass, without parsing anything per row. Times that don't fit
+in 64 bits cannot be stored in this format.
+
+The JSON layout is the one of notebook.json: a list of objects with
+"time_1", "time_2", "operation", and "result" keys, where times are
+strings in ms_to_str() format and the operation is "+" or "-". Files
+can be converted between the two formats with:
+
+    python3 -m gtimecalc.notebook.storage to-json SRC DST
+    python3 -m gtimecalc.notebook.storage from-json SRC DST
+'''
+
+import argparse
+from array import array
+from collections import OrderedDict
+import json
+import mmap
+import os
+import struct
+import sys
+
+from ..calculator.operation import Operation
+from ..persistence import atomic_write
+from ..time_tools import ms_to_str_many, str_to_ms
+
+
+MAGIC = b'GTCNOTE\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = _HEADER.size
+
+_NUM_FIELDS = 4
+RECORD_SIZE = 8 * _NUM_FIELDS
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+_OPERATION_MAP = {
+    '+': Operation.ADD,
+    '-': Operation.SUB,
+    }
+
+_OPERATION_SYMBOLS = ('+', '-')
+
+
+def new_columns():
+    '''Return empty (time1, time2, operation, result) columns.
+
+    They are the same types as the columns of EquationStore.
+    '''
+    return [array('q'), array('q'), bytearray(), array('q')]
+
+
+def append_row(columns, row):
+    '''Append a (time1, time2, operation, result) row to columns.
+
+    A time column is converted to a list if the value doesn't fit
+    in 64 bits.
+    '''
+    for field, value in enumerate(row):
+        try:
+            columns[field].append(value)
+        except OverflowError:
+            if not isinstance(columns[field], array):
+                raise
+            columns[field] = list(columns[field])
+            columns[field].append(value)
+
+
+def count_int64_rows(columns):
+    '''Return the number of leading rows that fit in the binary format.
+
+    Only time columns that are lists (rather than arrays) can have
+    values that don't fit in 64 bits.
+    '''
+    num_rows = len(columns[0])
+    for values in columns:
+        if not isinstance(values, list):
+            continue
+        for i in range(num_rows):
+            if not _INT64_MIN <= values[i] <= _INT64_MAX:
+                num_rows = i
+                break
+
+    return num_rows
+
+
+def pack(columns):
+    '''Pack (time1, time2, operation, result) columns to bytes.
+
+    Raises OverflowError if a time doesn't fit in 64 bits.
+    '''
+    num_rows = len(columns[0])
+    records = array('q', bytes(RECORD_SIZE * num_rows))
+    for field, values in enumerate(columns):
+        if isinstance(values, list):
+            values = array('q', values)
+        elif not isinstance(values, array):
+            # A bytearray would be taken as raw bytes
+            values = array('q', list(values))
+        records[field::_NUM_FIELDS] = values
+
+    if sys.byteorder == 'big':
+        records.byteswap()
+
+    return (
+        _HEADER.pack(MAGIC, VERSION, 0, num_rows) + records.tobytes())
+
+
+def unpack(buf):
+    '''Read columns from a buffer in the binary format.
+
+    Returns a (columns, end) tuple, where end is the offset of the
+    first byte after the records.
+
+    Raises ValueError if the data is invalid.
+    '''
+    if len(buf) < HEADER_SIZE:
+        raise ValueError('Not a notebook file')
+
+    magic, version, _, num_rows = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError('Not a notebook file')
+    if version != VERSION:
+        raise ValueError(
+            'Unsupported notebook file version {}'.format(version))
+
+    end = HEADER_SIZE + num_rows * RECORD_SIZE
+    if len(buf) < end:
+        raise ValueError('Notebook file is truncated')
+
+    records = array('q')
+    with memoryview(buf) as view:
+        records.frombytes(view[HEADER_SIZE:end])
+    if sys.byteorder == 'big':
+        records.byteswap()
+
+    operations = records[2::_NUM_FIELDS]
+    if operations and (min(operations) < 0 or max(operations) > 1):
+        raise ValueError('Invalid operation in notebook file')
+
+    columns = [
+        records[0::_NUM_FIELDS],
+        records[1::_NUM_FIELDS],
+        bytearray(operations.tolist()),
+        records[3::_NUM_FIELDS],
+        ]
+    return columns, end
+
+
+def load(path):
+    '''Load a binary notebook file.
+
+    Returns a (columns, tail) tuple, where tail is the bytes following
+    the records.
+
+    Raises OSError or ValueError on failure.
+    '''
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise ValueError('Not a notebook file')
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns, end = unpack(mm)
+            tail = mm[end:]
+
+    return columns, tail
+
+
+def save(path, columns):
+    '''Save columns to a binary notebook file atomically.
+
+    Raises OSError or OverflowError on failure.
+    '''
+    atomic_write(path, pack(columns))
+
+
+def to_json_layout(columns):
+    '''Convert columns to the JSON layout.'''
+    time1, time2, operations, results = columns
+    return [
+        OrderedDict((
+            ('time_1', time1),
+            ('time_2', time2),
+            ('operation', _OPERATION_SYMBOLS[operation]),
+            ('result', result)
+            ))
+        for time1, time2, operation, result in zip(
+            ms_to_str_many(time1),
+            ms_to_str_many(time2),
+            operations,
+            ms_to_str_many(results))
+        ]
+
+
+def _parse_json_time(time_str):
+    # str_to_ms() applies a sign only to the first component, so
+    # "-00:01:00.000" would be +60000; the times were written by
+    # ms_to_str(), which puts the sign before the absolute value
+    if time_str.startswith('-'):
+        return -str_to_ms(time_str[1:])
+    return str_to_ms(time_str)
+
+
+def from_json_layout(notebook):
+    '''Convert a notebook in the JSON layout to columns.
+
+    Invalid equations are skipped.
+    '''
+    columns = new_columns()
+    if not isinstance(notebook, list):
+        return columns
+
+    for eq in notebook:
+        try:
+            row = (
+                _parse_json_time(eq['time_1']),
+                _parse_json_time(eq['time_2']),
+                _OPERATION_MAP[eq['operation']],
+                _parse_json_time(eq['result']),
+                )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+
+        append_row(columns, row)
+
+    return columns
+
+
+def load_json(path):
+    '''Load a notebook in the JSON layout.
+
+    Raises OSError or ValueError on failure.
+    '''
+    with open(path, 'r', encoding='utf-8') as f:
+        return from_json_layout(json.load(f))
+
+
+def save_json(path, columns):
+    '''Save columns in the JSON layout atomically.
+
+    Raises OSError on failure.
+    '''
+    atomic_write(
+        path,
+        json.dumps(
+            to_json_layout(columns), ensure_ascii=False, indent=2
+            ).encode('utf-8'))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m gtimecalc.notebook.storage',
+        description=(
+            'Convert notebooks between the binary format and JSON. '
+            'A journal is replayed before converting.'))
+    parser.add_argument('direction', choices=('to-json', 'from-json'))
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    args = parser.parse_args(args)
+
+    try:
+        if args.direction == 'to-json':
+            from .journal import replay
+
+            columns, tail = load(args.src)
+            replay(columns, tail.decode('utf-8', 'replace').splitlines())
+            save_json(args.dst, columns)
+        else:
+            save(args.dst, load_json(args.src))
+    except OSError as e:
+        sys.stderr.write('{}\n'.format(e))
+        return 1
+    except (OverflowError, ValueError) as e:
+        sys.stderr.write('{}: {}\n'.format(args.src, e))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
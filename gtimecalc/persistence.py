@@ -0,0 +1,138 @@
+'''Saving of state files.
+
+Files are never written in place: the data goes to a temporary file
+in the same directory, which is flushed to disk and then renamed over
+the target, so a crash leaves either the old or the new file.
+
+StateFile also remembers what was last loaded or saved and skips
+writing the same data again, and can coalesce a series of changes
+into one delayed save.
+
+StateFile.save_later() needs a running GLib main loop.
+'''
+
+import os
+import tempfile
+
+
+# Delay of StateFile.save_later() in milliseconds
+SAVE_DELAY = 2000
+
+
+def fsync_dir(path):
+    '''Flush a directory to disk, making renames in it durable.
+
+    Errors are ignored, since not all systems (e.g. Windows) allow
+    opening directories.
+    '''
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    '''Replace the contents of a file with bytes atomically.
+
+    Raises OSError on failure; the original file is left intact.
+    '''
+    dir_path = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix='.{}.'.format(os.path.basename(path)),
+        suffix='.tmp',
+        dir=dir_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    fsync_dir(dir_path)
+
+
+class StateFile:
+    '''File that is written only when its contents change.
+
+    serialize is a function that returns the current contents as
+    bytes. The parent directory is created on the first save.
+    '''
+
+    def __init__(self, path, serialize, delay=SAVE_DELAY):
+        self.path = path
+        self._serialize = serialize
+        self._delay = delay
+        # Contents as they are on disk, if known
+        self._saved_data = None
+        self._source_id = 0
+
+    def load(self):
+        '''Read the file.
+
+        Returns bytes. Raises OSError on failure.
+        '''
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self._saved_data = data
+        return data
+
+    def is_dirty(self):
+        return self._serialize() != self._saved_data
+
+    def save(self):
+        '''Write the file if its contents changed.
+
+        Cancels a pending delayed save. Returns True if the file was
+        written. Raises OSError on failure.
+        '''
+        self._cancel_save_later()
+
+        data = self._serialize()
+        if data == self._saved_data:
+            return False
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        atomic_write(self.path, data)
+        self._saved_data = data
+        return True
+
+    def save_later(self):
+        '''Save the file after a delay, unless a save is pending.
+
+        Errors of the delayed save are ignored.
+        '''
+        if self._source_id:
+            return
+
+        from gi.repository import GLib
+
+        self._source_id = GLib.timeout_add(self._delay, self._on_timeout)
+
+    def _on_timeout(self):
+        self._source_id = 0
+        try:
+            self.save()
+        except OSError:
+            pass
+        return False
+
+    def _cancel_save_later(self):
+        if self._source_id:
+            from gi.repository import GLib
+
+            GLib.source_remove(self._source_id)
+            self._source_id = 0
@@ -3,24 +3,40 @@ import json
 import os
 
 from .config import CONFIG_DIR
+from .persistence import StateFile
 
 
 class _Settings(dict):
 
     _FILE = os.path.join(CONFIG_DIR, 'settings.json')
 
+    def __init__(self):
+        super().__init__()
+        self._file = StateFile(self._FILE, self._serialize)
+
+    def _serialize(self):
+        return json.dumps(
+            self, ensure_ascii=False, indent=2, sort_keys=True
+            ).encode('utf-8')
+
     def save(self):
+        '''Save the settings now if they were changed.'''
         try:
-            with open(self._FILE, 'w', encoding='utf-8') as f:
-                json.dump(
-                    self, f, ensure_ascii=False, indent=2, sort_keys=True)
+            self._file.save()
         except OSError:
             pass
 
+    def save_later(self):
+        '''Save the settings after a short delay.
+
+        Use this after changes made while the application is running;
+        several calls in a row result in a single write.
+        '''
+        self._file.save_later()
+
     def load(self):
         try:
-            with open(self._FILE, 'r', encoding='utf-8') as f:
-                self.update(json.load(f))
+            self.update(json.loads(self._file.load().decode('utf-8')))
         except (OSError, ValueError):
             pass
 
@@ -1,9 +1,37 @@
 
+from array import array
+import re
+import sys
+
+
 SECOND_MS = 1000
 MINUTE_MS = 60 * SECOND_MS
 HOUR_MS = 60 * MINUTE_MS
 
 
+class Precision:
+    '''Number of decimal places in the fractional part of seconds.
+
+    All functions in this module take an optional precision argument
+    that selects the unit of the integer times they work with:
+    milliseconds (the default), microseconds, or nanoseconds.
+    '''
+    MS = 3
+    US = 6
+    NS = 9
+
+
+def _unit_sizes(precision):
+    second = 10 ** precision
+    return 60 * 60 * second, 60 * second, second
+
+
+_UNIT_SIZES = {
+    precision: _unit_sizes(precision)
+    for precision in (Precision.MS, Precision.US, Precision.NS)
+    }
+
+
 def _ndivmod(x, y):
     '''Custom divmod to work with negative numbers.'''
     q = abs(x) // y
@@ -13,65 +41,320 @@ def _ndivmod(x, y):
     return q, r
 
 
-def join_units(hours, minutes, seconds, milliseconds):
-    '''Join time units to milliseconds.'''
+def join_units(hours, minutes, seconds, fraction, precision=Precision.MS):
+    '''Join time units to milliseconds.
+
+    fraction is the fractional part of seconds in units of the
+    precision (milliseconds by default), as is the result.
+    '''
+    hour, minute, second = _UNIT_SIZES[precision]
     return (
-        int(hours) * HOUR_MS +
-        int(minutes) * MINUTE_MS +
-        int(seconds) * SECOND_MS +
-        int(milliseconds))
+        int(hours) * hour +
+        int(minutes) * minute +
+        int(seconds) * second +
+        int(fraction))
+
+
+def split_units(time, precision=Precision.MS):
+    '''Split milliseconds by time units.
+
+    With a non-default precision, both the time and the last returned
+    unit are in microseconds or nanoseconds instead of milliseconds.
+    '''
+    hour, minute, second = _UNIT_SIZES[precision]
+    hours, time = _ndivmod(time, hour)
+    minutes, time = _ndivmod(time, minute)
+    seconds, time = _ndivmod(time, second)
+    return hours, minutes, seconds, time
+
+
+_numpy = None
+
+
+def _import_numpy():
+    '''Import NumPy on demand, since it's slow to import.
+
+    Returns None if NumPy is not available.
+    '''
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            _numpy = False
+        else:
+            _numpy = numpy
+
+    return _numpy or None
+
+
+def _as_int64_array(values):
+    '''Return values as a NumPy int64 array.
+
+    None is returned if NumPy is not available or values is neither
+    a NumPy signed integer array nor an array('q'); such sequences
+    may contain integers that don't fit in 64 bits, or floats, and
+    are processed in Python. So are arrays with the smallest int64,
+    the absolute value of which overflows.
+    '''
+    if len(values) == 0:
+        return None
+
+    if isinstance(values, array):
+        if values.typecode != 'q':
+            return None
+        numpy = _import_numpy()
+        if numpy is None:
+            return None
+        return _check_int64_min(numpy.frombuffer(values, dtype=numpy.int64))
+
+    # A NumPy array means that NumPy is already imported
+    numpy = sys.modules.get('numpy')
+    if (numpy is None
+            or not isinstance(values, numpy.ndarray)
+            or values.dtype.kind != 'i'):
+        return None
+    # Signed integers of any size fit in int64
+    return _check_int64_min(values.astype(numpy.int64, copy=False))
+
+
+def _check_int64_min(time):
+    numpy = sys.modules['numpy']
+    if time.min() == numpy.iinfo(numpy.int64).min:
+        return None
+    return time
+
+
+def _as_python_values(values):
+    '''Return values that _as_int64_array() didn't convert.
+
+    Elements of NumPy arrays are converted to Python numbers, so the
+    results are exactly the same as of the scalar functions.
+    '''
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.tolist()
+    return values
+
+
+def _ndivmod_array(x, y):
+    '''Vectorized version of _ndivmod() for NumPy arrays.'''
+    numpy = sys.modules['numpy']
+    q = numpy.abs(x) // y
+    q = numpy.where(x < 0, -q, q)
+    return q, x - y * q
+
+
+def split_units_many(values, precision=Precision.MS):
+    '''Split a sequence of milliseconds by time units.
+
+    values can be any sequence of integers, an array('q'), or a NumPy
+    integer array. The result is a list of tuples, the same as calling
+    split_units() for every value.
+    '''
+    time = _as_int64_array(values)
+    if time is None:
+        return [
+            split_units(v, precision) for v in _as_python_values(values)]
+
+    hour, minute, second = _UNIT_SIZES[precision]
+    hours, time = _ndivmod_array(time, hour)
+    minutes, time = _ndivmod_array(time, minute)
+    seconds, time = _ndivmod_array(time, second)
+    return list(zip(
+        hours.tolist(), minutes.tolist(), seconds.tolist(), time.tolist()))
+
 
+_SIGNS = ('-', '\N{MINUS SIGN}')
 
-def split_units(ms):
-    '''Split milliseconds by time units.'''
-    hours, ms = _ndivmod(ms, HOUR_MS)
-    minutes, ms = _ndivmod(ms, MINUTE_MS)
-    seconds, ms = _ndivmod(ms, SECOND_MS)
-    return hours, minutes, seconds, ms
+_STR_FORMATS = {
+    (unicode_symbols, precision): (
+        '{}{:02}' + ratio + '{:02}' + ratio + '{:02}.{:0%d}' % precision)
+    for unicode_symbols, ratio in enumerate((':', '\N{RATIO}'))
+    for precision in _UNIT_SIZES
+    }
 
 
-def ms_to_str(ms, unicode_symbols=False):
+def ms_to_str(ms, unicode_symbols=False, precision=Precision.MS):
     '''Convert milliseconds to a string in hh:mm:ss.ms format.
 
     If unicode_symbols is True, MUNUS SING will be used instead of a hyphen and
     RATIO instead of a colon.
+
+    The conversion uses only integer arithmetic, so it's exact for
+    integers of any size. With a non-default precision, ms is in
+    microseconds or nanoseconds, and the fractional part of seconds
+    has 6 or 9 digits respectively.
     '''
-    sign = ('-', '\N{MINUS SIGN}')[unicode_symbols] if ms < 0 else ''
-    ratio = (':', '\N{RATIO}')[unicode_symbols]
+    sign = _SIGNS[unicode_symbols] if ms < 0 else ''
+
+    hour, minute, second = _UNIT_SIZES[precision]
+    hours, ms = divmod(abs(ms), hour)
+    minutes, ms = divmod(ms, minute)
+    seconds, ms = divmod(ms, second)
+
+    return _STR_FORMATS[unicode_symbols, precision].format(
+        sign, hours, minutes, seconds, ms)
 
-    hours, ms = _ndivmod(ms, HOUR_MS)
-    minutes, ms = _ndivmod(ms, MINUTE_MS)
-    seconds = ms / SECOND_MS
-    seconds_pad = 6 if seconds < 10 else 0  # Pad only the integer part
 
-    return '{}{:02}{ratio}{:02}{ratio}{:0{}.3f}'.format(
-        sign, abs(hours), abs(minutes), abs(seconds), seconds_pad, ratio=ratio)
+def ms_to_str_many(values, unicode_symbols=False, precision=Precision.MS):
+    '''Convert a sequence of milliseconds to a list of strings.
+
+    values can be any sequence of integers, an array('q'), or a NumPy
+    integer array. The result is the same as calling ms_to_str() for
+    every value.
+    '''
+    hour, minute, second = _UNIT_SIZES[precision]
+    signs = ('', _SIGNS[unicode_symbols])
+
+    time = _as_int64_array(values)
+    if time is None:
+        def split(time):
+            is_negative = time < 0
+            hours, time = divmod(abs(time), hour)
+            minutes, time = divmod(time, minute)
+            seconds, time = divmod(time, second)
+            return is_negative, hours, minutes, seconds, time
 
+        units = map(split, _as_python_values(values))
+    else:
+        numpy = sys.modules['numpy']
+        is_negative = (time < 0).tolist()
+        hours, time = numpy.divmod(numpy.abs(time), hour)
+        minutes, time = numpy.divmod(time, minute)
+        seconds, time = numpy.divmod(time, second)
+        units = zip(
+            is_negative,
+            hours.tolist(), minutes.tolist(), seconds.tolist(), time.tolist())
+
+    fmt = _STR_FORMATS[unicode_symbols, precision].format
+    return [
+        fmt(signs[sign], hours, minutes, seconds, fraction)
+        for sign, hours, minutes, seconds, fraction in units]
+
+
+def _seconds_to_int(sign, seconds, precision):
+    '''Convert a decimal number of seconds to an integer time.
+
+    The fractional part is rounded to the precision with the "round
+    half to even" rule, without converting to float.
+    '''
+    int_part, _, frac_part = seconds.partition('.')
+    if len(frac_part) <= precision:
+        result = int(int_part + frac_part.ljust(precision, '0'))
+    else:
+        result = int(int_part + frac_part[:precision])
+        rest = int(frac_part[precision:])
+        half = 5 * 10 ** (len(frac_part) - precision - 1)
+        if rest > half or (rest == half and result % 2):
+            result += 1
+
+    return -result if sign else result
+
+
+# A single-pass parser for the common form of time strings: up to
+# three non-empty components, each separated by exactly one separator.
+# Anything else (omitted components, more than three components,
+# exotic float syntax, invalid strings) is handled by the generic
+# _parse_time_str(), so both paths accept the same grammar.
+_TIME_STR_RE = re.compile(
+    r'''
+    \s*
+    (?:
+        (?:
+            (?P<hours_sign>[-\N{MINUS SIGN}]?)(?P<hours>\d+)
+            (?:\s*[:\N{RATIO},]\s*|\s+)
+        )?
+        (?P<minutes_sign>[-\N{MINUS SIGN}]?)(?P<minutes>\d+)
+        (?:\s*[:\N{RATIO},]\s*|\s+)
+    )?
+    (?P<seconds_sign>[-\N{MINUS SIGN}]?)(?P<seconds>\d+\.?\d*|\.\d+)
+    \s*
+    ''',
+    re.VERBOSE)
+
+_SECONDS_RE = re.compile(r'(-?)(\d+\.?\d*|\.\d+)')
 
 _TIME_STR_TRANS = str.maketrans('\N{MINUS SIGN}\N{RATIO},', '-::')
 
 
-def str_to_ms(time_str):
+def _parse_time_str(time_str, precision):
+    time_str = time_str.translate(_TIME_STR_TRANS)
+
+    parts = []
+    for s in time_str.split(':'):
+        parts.extend(s.split() or ('',))
+
+    hour, minute, second = _UNIT_SIZES[precision]
+
+    result = 0
+    for val, unit in zip(reversed(parts), (second, minute, hour)):
+        if not val:
+            continue
+
+        if unit != second:
+            result += int(val) * unit
+            continue
+
+        match = _SECONDS_RE.fullmatch(val)
+        if match is not None:
+            result += _seconds_to_int(*match.groups(), precision)
+        else:
+            # Other float syntax, like exponents; round() raises
+            # OverflowError for infinity and ValueError for NaN
+            try:
+                result += round(float(val) * second)
+            except OverflowError:
+                raise ValueError(
+                    'Time is out of range: {!r}'.format(val)) from None
+
+    return result
+
+
+def str_to_ms(time_str, precision=Precision.MS):
     '''Convert a string in hh:mm:ss.ms format to milliseconds.
 
     Time components in the string can be separated by a colon,
     Unicode "RATIO", a comma, or whitespace. Negative values
     (with - or Unicode "MINUS SIGN") are also allowed.
 
+    With a non-default precision, the result is in microseconds or
+    nanoseconds. Extra digits in the fractional part of seconds are
+    rounded half to even.
+
     Raises ValueError if the string cannot be converted.
     '''
+    match = _TIME_STR_RE.fullmatch(time_str)
+    if match is None:
+        return _parse_time_str(time_str, precision)
 
-    time_str = time_str.translate(_TIME_STR_TRANS)
+    (hours_sign, hours,
+     minutes_sign, minutes,
+     seconds_sign, seconds) = match.groups()
 
-    parts = []
-    for s in time_str.split(':'):
-        parts.extend(s.split() or ('',))
+    result = _seconds_to_int(seconds_sign, seconds, precision)
+
+    if minutes is not None:
+        hour, minute, second = _UNIT_SIZES[precision]
+
+        if minutes_sign:
+            result -= int(minutes) * minute
+        else:
+            result += int(minutes) * minute
+
+        if hours is not None:
+            if hours_sign:
+                result -= int(hours) * hour
+            else:
+                result += int(hours) * hour
 
-    result = 0
-    for val, ms, val_t in zip(
-            reversed(parts),
-            (SECOND_MS, MINUTE_MS, HOUR_MS),
-            (float, int, int)):
-        if val:
-            result += round(val_t(val) * ms)
     return result
+
+
+def str_to_ms_many(time_strs, precision=Precision.MS):
+    '''Convert a sequence of strings to a list of milliseconds.
+
+    The result is the same as calling str_to_ms() for every string.
+    Raises ValueError if any of the strings cannot be converted.
+    '''
+    return [str_to_ms(s, precision) for s in time_strs]
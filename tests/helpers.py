@@ -0,0 +1,30 @@
+'''Helpers shared by tests.'''
+
+import random
+
+from gtimecalc.notebook import storage
+
+
+def to_columns(rows):
+    '''Convert (time1, time2, operation, result) rows to columns.'''
+    columns = storage.new_columns()
+    for row in rows:
+        storage.append_row(columns, row)
+    return columns
+
+
+def to_rows(columns):
+    return list(zip(*columns))
+
+
+def make_columns(num_rows, seed=0):
+    '''Return columns of random equations with times under 3 hours.'''
+    rnd = random.Random(seed)
+    rows = []
+    for _ in range(num_rows):
+        time1 = rnd.randrange(3 * 3600000)
+        time2 = rnd.randrange(3 * 3600000)
+        operation = rnd.randrange(2)
+        result = time1 - time2 if operation else time1 + time2
+        rows.append((time1, time2, operation, result))
+    return to_columns(rows)
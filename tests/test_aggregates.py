@@ -0,0 +1,115 @@
+from bisect import bisect_left
+import random
+import unittest
+
+from gtimecalc.notebook.aggregates import (
+    FenwickTree, MinMaxTree, RangeAggregates)
+
+
+class TestAggregates(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(0)
+        self.values = [rnd.randrange(-1000, 1000) for _ in range(100)]
+        self.ranges = [
+            tuple(sorted(rnd.sample(range(101), 2))) for _ in range(100)]
+
+    def test_fenwick_tree(self):
+        values = self.values
+        for tree in (FenwickTree(values), FenwickTree()):
+            if not len(tree):
+                for value in values:
+                    tree.append(value)
+            self.assertEqual(len(tree), len(values))
+            for start, stop in self.ranges:
+                self.assertEqual(
+                    tree.range_sum(start, stop), sum(values[start:stop]))
+
+        tree.add(10, 5)
+        self.assertEqual(tree.prefix_sum(11), sum(values[:11]) + 5)
+        self.assertEqual(tree.prefix_sum(10), sum(values[:10]))
+
+    def test_min_max_tree(self):
+        values = self.values
+        for tree in (MinMaxTree(values), MinMaxTree()):
+            if not len(tree):
+                for value in values:
+                    tree.append(value)
+            self.assertEqual(len(tree), len(values))
+            for start, stop in self.ranges:
+                self.assertEqual(
+                    tree.range_min_max(start, stop),
+                    (min(values[start:stop]), max(values[start:stop])))
+
+        self.assertEqual(tree.range_min_max(5, 5), (None, None))
+        tree.set(3, 10 ** 30)
+        self.assertEqual(tree.range_min_max(0, 100)[1], 10 ** 30)
+
+    def test_range_aggregates(self):
+        values = self.values[:50]
+        aggregates = RangeAggregates(lambda: values)
+        ranges = [(0, 3), (10, 20), (40, 50)]
+        selected = values[0:3] + values[10:20] + values[40:50]
+        self.assertEqual(
+            aggregates.query(ranges),
+            (len(selected), sum(selected), min(selected), max(selected)))
+        self.assertEqual(aggregates.query([]), (0, 0, None, None))
+
+        # Appends are picked up automatically
+        values.extend(self.values[50:])
+        ranges.append((90, 100))
+        selected += values[90:100]
+        self.assertEqual(
+            aggregates.query(ranges),
+            (len(selected), sum(selected), min(selected), max(selected)))
+
+        # Other changes need invalidate()
+        values[0] = 5000
+        aggregates.invalidate()
+        self.assertEqual(aggregates.query([(0, 1)]), (1, 5000, 5000, 5000))
+
+    def test_range_aggregates_insert(self):
+        rnd = random.Random(1)
+        values = sorted(self.values)
+        aggregates = RangeAggregates(lambda: values)
+        aggregates.MAX_INSERTED = 8
+
+        def check():
+            for start, stop in self.ranges + [(0, len(values))]:
+                selected = values[start:stop]
+                self.assertEqual(
+                    aggregates.query([(start, stop)]),
+                    (len(selected), sum(selected),
+                     min(selected, default=None),
+                     max(selected, default=None)))
+
+        check()
+        # Inserts keep the column sorted, like in a sorted store; more
+        # than MAX_INSERTED of them rebuild the index
+        trees = []
+        for _ in range(20):
+            value = rnd.randrange(-1000, 1000)
+            position = bisect_left(values, value)
+            values.insert(position, value)
+            aggregates.insert(position, value)
+            check()
+            if aggregates._sums not in trees:
+                trees.append(aggregates._sums)
+        # Built initially and after the 9th and 18th inserts
+        self.assertEqual(len(trees), 3)
+
+        values.append(5000)
+        aggregates.insert(len(values) - 1, 5000)
+        check()
+
+    def test_range_aggregates_replaced_values(self):
+        values = [1, 2, 3]
+        aggregates = RangeAggregates(lambda: values)
+        self.assertEqual(aggregates.query([(0, 3)]), (3, 6, 1, 3))
+
+        values = [30, 20, 10]
+        self.assertEqual(aggregates.query([(0, 2)]), (2, 50, 20, 30))
+
+
+if __name__ == '__main__':
+    unittest.main()
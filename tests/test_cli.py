@@ -0,0 +1,80 @@
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+from gtimecalc import cli
+
+
+class TestCli(unittest.TestCase):
+
+    def test_evaluate_line(self):
+        def evaluate(line):
+            result, is_time = cli.evaluate_line(line)
+            self.assertTrue(is_time)
+            return result
+
+        self.assertEqual(evaluate('01:00:00 + 00:30:00'), 5400000)
+        self.assertEqual(evaluate('01:00:00 - 00:30:00'), 1800000)
+        self.assertEqual(evaluate('00:30:00 \N{MINUS SIGN} 01:00:00'),
+                         -1800000)
+        self.assertEqual(evaluate('  1 30 0 + 1.5  '), 5401500)
+
+        # Like in the calculator, times are positive
+        self.assertEqual(evaluate('1:-70 + -1'), 11000)
+
+        # Expressions
+        self.assertEqual(evaluate('01:00:00+00:30:00'), 5400000)
+        self.assertEqual(evaluate('(1:00 + 2:00) * 2'), 360000)
+        self.assertEqual(evaluate('1:00 - 00:30 * 2'), 0)
+        self.assertEqual(cli.evaluate_line('1:00 / 0:30'), (2, False))
+
+        self.assertRaises(ValueError, cli.evaluate_line, '01:00:00 02')
+        self.assertRaises(ValueError, cli.evaluate_line, 'a + 1')
+        self.assertRaises(ValueError, cli.evaluate_line, '1:00 * 1:00')
+
+    def test_process(self):
+        output = io.StringIO()
+        errors = io.StringIO()
+        num_errors = cli.process(
+            ['1 + 2\n', '\n', 'x + 1\n', '3:00 - 1:00\n', '1:00 / 0:40\n'],
+            output, errors, 'input')
+
+        self.assertEqual(num_errors, 1)
+        self.assertEqual(
+            output.getvalue(), '00:00:03.000\n00:02:00.000\n1.5\n')
+        self.assertTrue(errors.getvalue().startswith('input:3: '))
+
+        # Overflows are reported like other errors
+        errors = io.StringIO()
+        num_errors = cli.process(
+            ['inf + 1\n', '1e400\n', '{} * 1.5\n'.format('9' * 400)],
+            io.StringIO(), errors, 'input')
+        self.assertEqual(num_errors, 3)
+        self.assertEqual(len(errors.getvalue().splitlines()), 3)
+
+    def test_no_gi(self):
+        bin_path = os.path.join(
+            os.path.dirname(__file__), '..', 'bin', 'gtimecalc-cli')
+        code = (
+            'import runpy, sys\n'
+            'sys.argv = ["gtimecalc-cli"]\n'
+            'try:\n'
+            '    runpy.run_path({!r}, run_name="__main__")\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'assert "gi" not in sys.modules\n'
+            ).format(bin_path)
+
+        proc = subprocess.run(
+            (sys.executable, '-c', code),
+            input='1 + 1\n',
+            stdout=subprocess.PIPE,
+            universal_newlines=True)
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout, '00:00:02.000\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
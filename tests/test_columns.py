@@ -0,0 +1,49 @@
+import random
+import unittest
+
+from gtimecalc.notebook import columns
+
+import helpers
+
+
+def make_columns(num_rows):
+    columns = helpers.make_columns(num_rows)
+    # A time column gets converted to a list by values over 64 bits
+    columns[1] = list(columns[1])
+    return columns
+
+
+class TestColumns(unittest.TestCase):
+
+    def test_index_ranges(self):
+        self.assertEqual(columns.index_ranges([]), [])
+        self.assertEqual(columns.index_ranges([5]), [(5, 6)])
+        self.assertEqual(
+            columns.index_ranges([0, 1, 2, 4, 6, 7, 9]),
+            [(0, 3), (4, 5), (6, 8), (9, 10)])
+
+    def test_delete_rows(self):
+        rnd = random.Random(0)
+        num_rows = 100
+        for num_selected in (0, 1, 2, 10, 50, 99, 100):
+            for _ in range(5):
+                indices = sorted(rnd.sample(range(num_rows), num_selected))
+                expected = make_columns(num_rows)
+                for index in reversed(indices):
+                    for values in expected:
+                        del values[index]
+
+                for func in (columns.delete_ranges, columns.rebuild_without):
+                    data = make_columns(num_rows)
+                    func(data, columns.index_ranges(indices))
+                    self.assertEqual(data, expected)
+                    for values, expected_values in zip(data, expected):
+                        self.assertIs(type(values), type(expected_values))
+
+                data = make_columns(num_rows)
+                columns.delete_rows(data, indices)
+                self.assertEqual(data, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import unittest
+
+from gtimecalc.notebook import exporting
+from gtimecalc.notebook.exporting import Template
+from gtimecalc.time_tools import ms_to_str, str_to_ms
+
+
+ROW = ('01:00:00.000', '00:00:01.500', '+', '01:00:01.500')
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_format(self):
+        for format_string, expected in (
+                ('', ''),
+                ('%1 %o %2 = %r',
+                 '01:00:00.000 + 00:00:01.500 = 01:00:01.500'),
+                ('%r%n%r', '01:00:01.500\n01:00:01.500'),
+                ('%1%t%2', '01:00:00.000\t00:00:01.500'),
+                ('100%%', '100%'),
+                # Unknown specifiers and a trailing % are kept
+                ('%x %', '%x %'),
+                ('%', '%'),
+                ('%%%r', '%01:00:01.500'),
+                ('%x%r', '%x01:00:01.500'),
+                # str.format() syntax has no effect
+                ('{0} {r} }{', '{0} {r} }{'),
+                ):
+            self.assertEqual(Template(format_string).format(ROW), expected)
+
+    def test_fields(self):
+        self.assertEqual(Template('%r %1 %r').fields, (3, 0))
+        self.assertEqual(Template('%% %n').fields, ())
+
+    def test_format_columns(self):
+        rows = [ROW, ('a', 'b', '-', 'c')]
+        columns = list(zip(*rows))
+        for format_string in ('%1 %o %2 = %r', '%r', '%r%1', 'text'):
+            template = Template(format_string)
+            self.assertEqual(
+                list(template.format_columns(columns, len(rows))),
+                [template.format(row) for row in rows])
+
+        columns = [None, None, None, ['x', 'y']]
+        self.assertEqual(
+            list(Template('[%r]').format_columns(columns, 2)),
+            ['[x]', '[y]'])
+
+
+class TestExport(unittest.TestCase):
+
+    # (time1, time2, operation, result)
+    COLUMNS = (
+        [3600000, 1500, 0],
+        [1500, 3000, 2 ** 70],
+        [0, 1, 0],
+        [3601500, -1500, 2 ** 70],
+        )
+
+    def export_text(self, export_format, indices, **kwargs):
+        f = io.StringIO()
+        progress = list(exporting.export(
+            f, export_format, self.COLUMNS, indices, chunk_size=2,
+            **kwargs))
+        self.assertEqual(
+            progress,
+            [min(i + 2, len(indices)) for i in range(0, len(indices), 2)])
+        self.assertEqual(
+            f.getvalue().splitlines(),
+            list(exporting.iter_lines(
+                export_format, self.COLUMNS, indices, chunk_size=2,
+                **kwargs)))
+        return f.getvalue()
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(exporting.iter_chunks([], 2)), [])
+        self.assertEqual(
+            list(exporting.iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_template(self):
+        f = io.StringIO(newline='\r\n')
+        progress = list(exporting.export(
+            f, exporting.FORMAT_TEMPLATE, self.COLUMNS, [1, 0, 2],
+            template=Template('%1 %o %2 = %r'), chunk_size=2))
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(
+            f.getvalue(),
+            '00:00:01.500 - 00:00:03.000 = -00:00:01.500\r\n'
+            '01:00:00.000 + 00:00:01.500 = 01:00:01.500\r\n'
+            '00:00:00.000 + {0} = {0}\r\n'.format(ms_to_str(2 ** 70)))
+
+    def test_table(self):
+        self.assertEqual(
+            self.export_text(exporting.FORMAT_CSV, [0, 1]),
+            'time_1,time_2,operation,result\n'
+            '01:00:00.000,00:00:01.500,+,01:00:01.500\n'
+            '00:00:01.500,00:00:03.000,-,-00:00:01.500\n')
+        self.assertEqual(
+            self.export_text(
+                exporting.FORMAT_TSV, [2],
+                times=exporting.TIMES_MS),
+            'time_1_ms\ttime_2_ms\toperation\tresult_ms\n'
+            '0\t{0}\t+\t{0}\n'.format(2 ** 70))
+        self.assertEqual(
+            self.export_text(
+                exporting.FORMAT_CSV, [1],
+                times=exporting.TIMES_BOTH),
+            'time_1,time_1_ms,time_2,time_2_ms,operation,result,result_ms\n'
+            '00:00:01.500,1500,00:00:03.000,3000,-,-00:00:01.500,-1500\n')
+
+    def test_jsonl(self):
+        for times in exporting.TIMES:
+            lines = self.export_text(
+                exporting.FORMAT_JSONL, [0, 1, 2], times=times).splitlines()
+            objects = [json.loads(line) for line in lines]
+            self.assertEqual(
+                [obj['operation'] for obj in objects], ['+', '-', '+'])
+            if times != exporting.TIMES_TEXT:
+                self.assertEqual(
+                    [obj['result_ms'] for obj in objects],
+                    self.COLUMNS[3])
+            if times != exporting.TIMES_MS:
+                self.assertEqual(
+                    [str_to_ms(obj['time_2']) for obj in objects],
+                    self.COLUMNS[1])
+            else:
+                self.assertNotIn('time_2', objects[0])
+
+    def test_columns(self):
+        columns = [values[:2] for values in self.COLUMNS]
+        f = io.BytesIO()
+        progress = list(exporting.export(
+            f, exporting.FORMAT_COLUMNS, columns, [1, 0], chunk_size=1))
+        self.assertEqual(progress[-1], 2)
+        self.assertEqual(progress, sorted(progress))
+
+        data = f.getvalue()
+        magic, version, num_columns, num_rows = struct.unpack_from(
+            '<8sIIQ', data)
+        self.assertEqual(
+            (magic, version, num_columns, num_rows),
+            (exporting.COLUMNS_MAGIC, exporting.COLUMNS_VERSION, 4, 2))
+        values = struct.unpack_from('<8q', data, 24)
+        self.assertEqual(
+            values,
+            (1500, 3600000, 3000, 1500, 1, 0, -1500, 3601500))
+
+        with self.assertRaises(OverflowError):
+            list(exporting.export(
+                io.BytesIO(), exporting.FORMAT_COLUMNS, self.COLUMNS,
+                [0, 1, 2]))
+
+
+class TestExportFile(unittest.TestCase):
+
+    COLUMNS = TestExport.COLUMNS
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'export.txt')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_export_file(self):
+        progress = []
+        self.assertTrue(exporting.export_file(
+            self.path, exporting.FORMAT_CSV, self.COLUMNS, [0, 1],
+            line_ending='\r\n', progress=progress.append, chunk_size=1))
+        self.assertEqual(progress, [1, 2])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read().count(b'\r\n'), 3)
+
+    def test_cancel(self):
+        cancelled = threading.Event()
+        progress = []
+
+        def cancel(num_rows):
+            progress.append(num_rows)
+            cancelled.set()
+
+        self.assertFalse(exporting.export_file(
+            self.path, exporting.FORMAT_TEMPLATE, self.COLUMNS, [0, 1, 2],
+            progress=cancel, cancelled=cancelled,
+            template=Template('%r'), chunk_size=1))
+        self.assertEqual(progress, [1])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_error(self):
+        with self.assertRaises(OverflowError):
+            exporting.export_file(
+                self.path, exporting.FORMAT_COLUMNS, self.COLUMNS,
+                [0, 1, 2])
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
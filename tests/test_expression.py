@@ -0,0 +1,73 @@
+import unittest
+from fractions import Fraction
+
+from gtimecalc.calculator import expression
+from gtimecalc.time_tools import Precision
+
+
+class TestExpression(unittest.TestCase):
+
+    def test_evaluate(self):
+        evaluate = expression.evaluate
+
+        self.assertEqual(
+            evaluate('01:30:00 + 45:00 - 00:00:12.5 * 3'), 8062500)
+        self.assertEqual(evaluate('(01:30:00 + 45:00) * 2'), 16200000)
+        self.assertEqual(evaluate('-1:00 + 30'), -30000)
+        self.assertEqual(evaluate('\N{MINUS SIGN}(1:00 - 2:00)'), 60000)
+        self.assertEqual(
+            evaluate('1:00 \N{MINUS SIGN} 30 \N{MULTIPLICATION SIGN} 2 '
+                     '\N{DIVISION SIGN} 4'),
+            45000)
+        self.assertEqual(evaluate(':30 + .5'), 30500)
+        self.assertEqual(evaluate('1\N{RATIO}00:00'), 3600000)
+
+        # Exact arithmetic, rounded at the end
+        self.assertEqual(evaluate('0:01 / 3 * 3'), 1000)
+        self.assertEqual(evaluate('0:00.001 / 2'), 0)
+        self.assertEqual(evaluate('0:00.003 / 2'), 2)
+
+        # Numbers
+        self.assertEqual(evaluate('2 * 3'), 6)
+        self.assertEqual(evaluate('1:00 / 0:40'), Fraction(3, 2))
+        self.assertEqual(evaluate('1:00 / 0:30'), 2)
+
+        # Variables
+        self.assertEqual(
+            evaluate('a + b * 2', {'a': 1000, 'b': 2000}), 5000)
+        self.assertEqual(
+            evaluate('(t1 - t2) / 2', {'t1': 3000, 't2': 1000}), 1000)
+        # Names of parameters are valid variables
+        self.assertEqual(
+            evaluate('text + self + values', {
+                'text': 1000, 'self': 2000, 'values': 3000}),
+            6000)
+
+    def test_errors(self):
+        evaluate = expression.evaluate
+
+        for text in (
+                '', '1:00 +', '(1:00', '1:00)', '1:00 1:00', '1:00 * 1:00',
+                '2 / 1:00', '1:00 / 0', '1.0: + 1', '1:00 % 2', 'a'):
+            self.assertRaises(ValueError, evaluate, text)
+
+    def test_compile(self):
+        compiled = expression.compile_expression('t * 2 + 0:01')
+        self.assertIs(
+            expression.compile_expression('t * 2 + 0:01'), compiled)
+
+        self.assertTrue(compiled.is_time)
+        self.assertEqual(compiled.variables, frozenset(('t', )))
+        self.assertEqual(
+            [compiled({'t': t}) for t in range(3)], [1000, 1002, 1004])
+
+        self.assertFalse(expression.compile_expression('1:00 / t').is_time)
+
+    def test_precision(self):
+        compiled = expression.compile_expression(
+            '0:01.000001 + 1', Precision.US)
+        self.assertEqual(compiled(), 2000001)
+
+
+if __name__ == '__main__':
+    unittest.main()
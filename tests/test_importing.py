@@ -0,0 +1,153 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from gtimecalc.notebook import exporting, importing
+
+
+# (time1, time2, operation, result)
+COLUMNS = (
+    [3600000, 1500, 0, 2 ** 70],
+    [1500, 3000, 60000, 1],
+    [0, 1, 0, 1],
+    [3601500, -1500, 60000, 2 ** 70 - 1],
+    )
+
+
+class TestImporting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'import.txt')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def export(self, export_format, **kwargs):
+        f = io.StringIO()
+        for _ in exporting.export(
+                f, export_format, COLUMNS, range(len(COLUMNS[0])),
+                **kwargs):
+            pass
+        self.write(f.getvalue().encode())
+
+    def assert_imported(self, result, columns=COLUMNS):
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.num_errors, 0)
+        self.assertEqual([list(values) for values in result.columns],
+                         [list(values) for values in columns])
+
+    def test_parse_text_line(self):
+        self.assertEqual(
+            importing.parse_text_line('1:00:00 + 0:30'),
+            (3600000, 30000, 0, 3630000))
+        self.assertEqual(
+            importing.parse_text_line(' 1:00:00 \N{MINUS SIGN} 2:00:00 '),
+            (3600000, 7200000, 1, -3600000))
+        # The result is computed
+        self.assertEqual(
+            importing.parse_text_line('1:00:00 - 2:00:00 = 5:00:00'),
+            (3600000, 7200000, 1, -3600000))
+        self.assertEqual(
+            importing.parse_text_line('1.500'), (1500, 0, 0, 1500))
+        # Absolute values of times are used, like in the calculator
+        self.assertEqual(
+            importing.parse_text_line('-1.500 - -3.000'),
+            (1500, 3000, 1, -1500))
+        for line in ('abc', '1:00:00 + abc', 'abc - 1.500', 'inf + 1',
+                     '1e400'):
+            with self.assertRaises(ValueError):
+                importing.parse_text_line(line)
+
+    def test_round_trip(self):
+        self.export(
+            exporting.FORMAT_TEMPLATE,
+            template=exporting.Template('%1 %o %2 = %r'))
+        self.assert_imported(importing.import_file(self.path))
+
+        for export_format in (exporting.FORMAT_CSV, exporting.FORMAT_TSV,
+                              exporting.FORMAT_JSONL):
+            for times in exporting.TIMES:
+                self.export(export_format, times=times)
+                self.assert_imported(importing.import_file(self.path))
+
+    def test_errors(self):
+        self.write(
+            b'time_1,time_2,operation\r\n'
+            b'1:00:00,2:00:00,+\r\n'
+            b'\r\n'
+            b'1:00:00,x,+\r\n'
+            b'1:00:00,2:00:00\r\n'
+            b'1:00:00,2:00:00,*\r\n'
+            b'3:00:00,2:00:00,-\r\n')
+        result = importing.import_file(self.path)
+        self.assertEqual(
+            [list(values) for values in result.columns],
+            [[3600000, 10800000],
+             [7200000, 7200000],
+             [0, 1],
+             [10800000, 3600000]])
+        self.assertEqual(result.num_errors, 3)
+        self.assertEqual(
+            [line_num for line_num, message in result.errors], [4, 5, 6])
+
+        self.write(b'time_1,operation\n1:00:00,+\n')
+        with self.assertRaises(ValueError):
+            importing.import_file(self.path)
+
+        self.write(b'{"time_1": "1:", "time_2": "2:", "operation": "+"}\n'
+                   b'{"time_1": 1, "time_2": "2:", "operation": "+"}\n'
+                   b'[]\n'
+                   b'{\n')
+        result = importing.import_file(self.path)
+        self.assertEqual(len(result.columns[0]), 1)
+        self.assertEqual(
+            [line_num for line_num, message in result.errors], [2, 3, 4])
+
+        self.write(b'1 + 2\ninf + 1\n1e400\n3 - 1\n')
+        result = importing.import_file(self.path)
+        self.assertEqual(list(result.columns[3]), [3000, 2000])
+        self.assertEqual(
+            [line_num for line_num, message in result.errors], [2, 3])
+
+    def test_chunks(self):
+        lines = ['{}: + 1.{:03}'.format(i, i) for i in range(1000)]
+        lines[10] = 'invalid'
+        lines[900] = 'invalid'
+        self.write('﻿{}\n'.format('\n'.join(lines)).encode())
+
+        expected = importing.parse_lines(lines, importing.KIND_TEXT)
+        self.assertEqual(
+            [line_num for line_num, message in expected.errors], [11, 901])
+
+        pool_min_size = importing.POOL_MIN_SIZE
+        try:
+            for importing.POOL_MIN_SIZE in (pool_min_size, 0):
+                result = importing.import_file(
+                    self.path, processes=2, chunk_size=1000)
+                self.assertEqual(result, expected)
+        finally:
+            importing.POOL_MIN_SIZE = pool_min_size
+
+    def test_cancel(self):
+        self.write(b'1 + 2\n' * 1000)
+        cancelled = threading.Event()
+        cancelled.set()
+        pool_min_size = importing.POOL_MIN_SIZE
+        try:
+            for importing.POOL_MIN_SIZE in (pool_min_size, 0):
+                self.assertIsNone(importing.import_file(
+                    self.path, processes=2, chunk_size=1000,
+                    cancelled=cancelled))
+        finally:
+            importing.POOL_MIN_SIZE = pool_min_size
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gtimecalc.notebook import journal, storage
+from gtimecalc.notebook.journal import Journal
+
+from helpers import to_columns, to_rows
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'notebook.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def reload(self):
+        j = Journal(self.path)
+        columns = j.load()
+        j.close()
+        return to_rows(columns)
+
+    def test_missing(self):
+        self.assertIsNone(Journal(self.path).load())
+
+    def test_unreadable(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a journal')
+        j = Journal(self.path)
+        with self.assertRaises(ValueError):
+            j.load()
+        # The unreadable journal is not overwritten
+        j.compact(to_columns([(1, 2, 0, 3)]), wait=True)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'not a journal')
+
+        bad_path = j.move_aside()
+        self.assertFalse(os.path.exists(self.path))
+        with open(bad_path, 'rb') as f:
+            self.assertEqual(f.read(), b'not a journal')
+
+        j.compact(to_columns([(1, 2, 0, 3)]), wait=True)
+        j.close()
+        self.assertEqual(self.reload(), [(1, 2, 0, 3)])
+
+    def test_replay(self):
+        lines = [
+            '["add",1,2,0,3]',
+            '["add",5,2,1,3]',
+            '["add",5,3,1,2]',
+            '["remove",0,2]',
+            '["add",1,1,0,2',
+            '["add","1",1,0,2]',
+            '["add",1,1,2,2]',
+            '["add",1,1,0,2]',
+            ]
+        columns = storage.new_columns()
+        self.assertEqual(journal.replay(columns, lines), 5)
+        self.assertEqual(to_rows(columns), [(5, 2, 1, 3), (1, 1, 0, 2)])
+
+        # Invalid removals are skipped as a whole
+        self.assertEqual(
+            journal.replay(columns, [
+                '["remove",1,0]',
+                '["remove",0,0]',
+                '["remove",0,2]',
+                '["remove",true]',
+                '["remove",-1]',
+                ]),
+            0)
+        self.assertEqual(to_rows(columns), [(5, 2, 1, 3), (1, 1, 0, 2)])
+
+        journal.replay(columns, ['["clear"]'])
+        self.assertEqual(to_rows(columns), [])
+
+    def test_changes(self):
+        j = Journal(self.path)
+        j.compact(to_columns([(1, 2, 0, 3)]), wait=True)
+        j.add((10, 2, 1, 8))
+        j.add((2 ** 70, 1, 0, 2 ** 70 + 1))
+        j.remove([0])
+        self.assertEqual(self.reload(), [
+            (10, 2, 1, 8), (2 ** 70, 1, 0, 2 ** 70 + 1)])
+
+        j.clear()
+        j.add((4, 4, 1, 0))
+        j.close()
+        self.assertEqual(self.reload(), [(4, 4, 1, 0)])
+
+    def test_torn_line(self):
+        j = Journal(self.path)
+        j.compact(to_columns([(1, 2, 0, 3)]), wait=True)
+        j.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'["add",4,5')
+
+        j = Journal(self.path)
+        self.assertEqual(to_rows(j.load()), [(1, 2, 0, 3)])
+        j.add((4, 5, 0, 9))
+        j.close()
+        self.assertEqual(self.reload(), [(1, 2, 0, 3), (4, 5, 0, 9)])
+
+    def test_compaction(self):
+        rows = [(i, i, i % 2, i * 2) for i in range(100)]
+        rows.append((2 ** 64, 1, 0, 2 ** 64 + 1))
+        j = Journal(self.path)
+        j.compact(to_columns([]), wait=True)
+        for row in rows:
+            j.add(row)
+        j.remove(range(50))
+        del rows[:50]
+        size = os.path.getsize(self.path)
+
+        old_min_size = journal.COMPACT_MIN_SIZE
+        journal.COMPACT_MIN_SIZE = 0
+        try:
+            self.assertTrue(j.needs_compaction())
+        finally:
+            journal.COMPACT_MIN_SIZE = old_min_size
+
+        # Changes made during compaction must be kept
+        columns = to_columns(rows)
+        j.compact(columns)
+        del columns[0][:]
+        j.add((1, 1, 0, 2))
+        j.remove([0])
+        j.close()
+
+        self.assertLess(os.path.getsize(self.path), size)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+        self.assertEqual(self.reload(), rows[1:] + [(1, 1, 0, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
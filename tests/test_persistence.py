@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gtimecalc.persistence import atomic_write, StateFile
+
+
+class TestPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_atomic_write(self):
+        atomic_write(self.path, b'old')
+        atomic_write(self.path, b'new')
+        self.assertEqual(self.read(), b'new')
+
+        # A failed write leaves the old file and no temporary files
+        with self.assertRaises(TypeError):
+            atomic_write(self.path, 'not bytes')
+        self.assertEqual(self.read(), b'new')
+        self.assertEqual(os.listdir(self.dir), ['state.json'])
+
+    def test_state_file(self):
+        data = b'1'
+        path = os.path.join(self.dir, 'subdir', 'state.json')
+        state_file = StateFile(path, lambda: data)
+
+        self.assertTrue(state_file.is_dirty())
+        self.assertTrue(state_file.save())
+        self.assertFalse(state_file.is_dirty())
+        self.assertFalse(state_file.save())
+
+        data = b'2'
+        self.assertTrue(state_file.save())
+
+        # Loading makes the file clean
+        state_file = StateFile(path, lambda: data)
+        self.assertEqual(state_file.load(), b'2')
+        mtime = os.stat(path).st_mtime_ns
+        self.assertFalse(state_file.save())
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from gtimecalc.notebook import search
+from gtimecalc.time_tools import ms_to_str
+
+from helpers import make_columns
+
+
+def format_row(columns, i):
+    return '{} {} {} = {}'.format(
+        ms_to_str(columns[0][i]),
+        '+-'[columns[2][i]],
+        ms_to_str(columns[1][i]),
+        ms_to_str(columns[3][i]))
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = make_columns(200)
+
+    def test_result_index(self):
+        results = self.columns[3]
+        index = search.ResultIndex(results[:100])
+        for result in results[100:]:
+            index.append(result)
+
+        for min_result, max_result in (
+                (None, None), (0, 3600000), (-3600000, None),
+                (None, 0), (5, 4)):
+            expected = [
+                i for i, result in enumerate(results)
+                if (min_result is None or result >= min_result)
+                and (max_result is None or result <= max_result)]
+            self.assertEqual(
+                sorted(index.find(min_result, max_result)), expected)
+
+    def test_text_index(self):
+        columns = self.columns
+        index = search.TextIndex([values[:100] for values in columns])
+        index.extend(columns, 100)
+        self.assertEqual(len(index), 200)
+
+        for query in ('00:1', '+ 01', '= -', '.5', ' ', '0 = 0', 'x', ''):
+            expected = [
+                i for i in range(200) if query in format_row(columns, i)]
+            self.assertEqual(index.find(query), expected)
+
+    def test_row_filter(self):
+        columns = self.columns
+        num_rows = 100
+        row_filter = search.RowFilter(
+            lambda: [values[:num_rows] for values in columns])
+        self.assertFalse(row_filter.is_active)
+
+        row_filter.set_criteria(
+            '\N{MINUS SIGN}00\N{RATIO}', min_result=-3600000, max_result=0)
+        self.assertTrue(row_filter.is_active)
+
+        def check():
+            for i in range(num_rows):
+                self.assertEqual(
+                    row_filter.is_visible(i),
+                    '-00:' in format_row(columns, i)
+                    and -3600000 <= columns[3][i] <= 0)
+
+            order = list(reversed(range(num_rows)))
+            self.assertEqual(
+                row_filter.filter_indices(order),
+                [i for i in order if row_filter.is_visible(i)])
+
+        check()
+        # Appended rows
+        num_rows = 200
+        check()
+
+        # Other changes
+        del columns[3][:50]
+        del columns[0][:50]
+        del columns[1][:50]
+        del columns[2][:50]
+        num_rows = 150
+        row_filter.invalidate()
+        check()
+
+        row_filter.set_criteria()
+        self.assertFalse(row_filter.is_active)
+        self.assertTrue(row_filter.is_visible(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
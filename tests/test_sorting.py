@@ -0,0 +1,74 @@
+from array import array
+import random
+import unittest
+
+from gtimecalc.notebook import sorting
+
+
+def apply_order(values, order):
+    if order is None:
+        return list(values)
+    return [values[i] for i in order]
+
+
+class TestSorting(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(0)
+        self.values = array('q', (rnd.randrange(-50, 50) for _ in range(300)))
+
+    def test_sorted_indices(self):
+        order = sorting.sorted_indices(self.values)
+        self.assertEqual(
+            apply_order(self.values, order), sorted(self.values))
+        # Equal values keep the order of insertion
+        for i in range(1, len(order)):
+            if self.values[order[i - 1]] == self.values[order[i]]:
+                self.assertLess(order[i - 1], order[i])
+
+        values = [2 ** 70, -2 ** 70, 0]
+        self.assertEqual(list(sorting.sorted_indices(values)), [1, 2, 0])
+
+    def test_insert_position(self):
+        for descending in (False, True):
+            values = array('q')
+            order = array('q')
+            for value in self.values:
+                values.append(value)
+                position = sorting.insert_position(
+                    values, order, value, descending)
+                order.insert(position, len(values) - 1)
+
+            expected = sorting.sorted_indices(values)
+            if descending:
+                expected = expected[::-1]
+            self.assertEqual(order, expected)
+
+    def test_remove_indices(self):
+        rnd = random.Random(1)
+        order = sorting.sorted_indices(self.values)
+        for num_removed in (0, 1, 10, 150, 300):
+            indices = sorted(rnd.sample(range(len(order)), num_removed))
+            values = array('q', (
+                value for i, value in enumerate(self.values)
+                if i not in indices))
+
+            new_order = sorting.remove_indices(order, indices)
+            self.assertEqual(new_order, sorting.sorted_indices(values))
+
+    def test_reorder_map(self):
+        num_rows = len(self.values)
+        ascending = sorting.sorted_indices(self.values)
+        orders = (None, ascending, ascending[::-1])
+        for old_order in orders:
+            old_rows = apply_order(range(num_rows), old_order)
+            for new_order in orders:
+                new_rows = apply_order(range(num_rows), new_order)
+                self.assertEqual(
+                    [old_rows[position] for position in sorting.reorder_map(
+                        old_order, new_order, num_rows)],
+                    new_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
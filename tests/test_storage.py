@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from gtimecalc.notebook import storage
+
+from helpers import to_columns
+
+
+ROWS = [
+    (3600000, 1800000, 0, 5400000),
+    (1800000, 9000000, 1, -7200000),
+    (-2 ** 63, 2 ** 63 - 1, 0, -1),
+    ]
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_pack(self):
+        data = storage.pack(to_columns(ROWS))
+        self.assertEqual(
+            len(data), storage.HEADER_SIZE + len(ROWS) * storage.RECORD_SIZE)
+
+        columns, end = storage.unpack(data + b'tail')
+        self.assertEqual(list(zip(*columns)), ROWS)
+        self.assertIsInstance(columns[2], bytearray)
+        self.assertEqual(data[end:], b'')
+
+        columns, end = storage.unpack(storage.pack(storage.new_columns()))
+        self.assertEqual(list(zip(*columns)), [])
+
+        with self.assertRaises(OverflowError):
+            storage.pack(to_columns([(2 ** 63, 0, 0, 2 ** 63)]))
+
+    def test_invalid(self):
+        data = storage.pack(to_columns(ROWS))
+        for invalid in (
+                b'',
+                b'x' + data[1:],
+                data[:8] + b'\2' + data[9:],
+                data[:-1],
+                data.replace(b'\1' + b'\0' * 7, b'\2' + b'\0' * 7)):
+            with self.assertRaises(ValueError):
+                storage.unpack(invalid)
+
+    def test_load(self):
+        path = os.path.join(self.dir, 'notebook')
+        storage.save(path, to_columns(ROWS))
+        with open(path, 'ab') as f:
+            f.write(b'tail')
+
+        columns, tail = storage.load(path)
+        self.assertEqual(list(zip(*columns)), ROWS)
+        self.assertEqual(tail, b'tail')
+
+        open(path, 'wb').close()
+        with self.assertRaises(ValueError):
+            storage.load(path)
+
+    def test_count_int64_rows(self):
+        columns = to_columns(ROWS)
+        self.assertEqual(storage.count_int64_rows(columns), 3)
+        storage.append_row(columns, (2 ** 63, 0, 0, 2 ** 63))
+        self.assertIsInstance(columns[0], list)
+        storage.append_row(columns, (1, 1, 0, 2))
+        self.assertEqual(storage.count_int64_rows(columns), 3)
+
+    def test_json_layout(self):
+        notebook = storage.to_json_layout(to_columns(ROWS[:2]))
+        self.assertEqual(notebook[1], {
+            'time_1': '00:30:00.000',
+            'time_2': '02:30:00.000',
+            'operation': '-',
+            'result': '-02:00:00.000',
+            })
+
+        notebook.insert(1, {'time_1': 'x'})
+        columns = storage.from_json_layout(notebook)
+        self.assertEqual(list(zip(*columns)), ROWS[:2])
+
+        # Negative times with zero leading components
+        rows = [(30000, 120000, 1, -90000), (-1500, -61001, 0, -62501)]
+        columns = storage.from_json_layout(
+            storage.to_json_layout(to_columns(rows)))
+        self.assertEqual(list(zip(*columns)), rows)
+        self.assertEqual(list(zip(*storage.from_json_layout({}))), [])
+
+    def test_convert(self):
+        json_path = os.path.join(self.dir, 'notebook.json')
+        bin_path = os.path.join(self.dir, 'notebook')
+        json_path2 = os.path.join(self.dir, 'notebook2.json')
+
+        storage.save_json(json_path, to_columns(ROWS[:2]))
+        self.assertEqual(
+            storage.main(['from-json', json_path, bin_path]), 0)
+        with open(bin_path, 'ab') as f:
+            f.write(b'["add",1000,2000,0,3000]\n')
+        self.assertEqual(
+            storage.main(['to-json', bin_path, json_path2]), 0)
+
+        with open(json_path2, 'r', encoding='utf-8') as f:
+            notebook = json.load(f)
+        self.assertEqual(len(notebook), 3)
+        self.assertEqual(notebook[2]['result'], '00:00:03.000')
+
+        with redirect_stderr(io.StringIO()):
+            self.assertEqual(
+                storage.main(['to-json', json_path, json_path2]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,22 @@
 
 import unittest
 import operator
+import itertools
+from array import array
 
 from gtimecalc import time_tools
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_MANY_VALUES = (
+    0, 1, -1, 999, 1001, -1001, 61001, -61001, 3661001, -3661001,
+    3723004, -3723004, 12345678, -12345678, 360000000000,
+    -2 ** 63, 2 ** 63 - 1)
+
 
 class TestTimeTools(unittest.TestCase):
 
@@ -86,6 +99,9 @@ class TestTimeTools(unittest.TestCase):
         self.assertRaises(ValueError, to_ms, ':-:1')
         self.assertRaises(ValueError, to_ms, '--1')
         self.assertRaises(ValueError, to_ms, '1-')
+        self.assertRaises(ValueError, to_ms, 'inf')
+        self.assertRaises(ValueError, to_ms, '1:1e400')
+        self.assertRaises(ValueError, to_ms, 'nan')
         self.assertRaises(ValueError, to_ms, '1.:')
         self.assertRaises(ValueError, to_ms, '1.0:')
         self.assertRaises(ValueError, to_ms, '1.::')
@@ -140,6 +156,102 @@ class TestTimeTools(unittest.TestCase):
         self.assertEqual(to_ms('1   2   3.004'), 3723004)
         self.assertEqual(to_ms(' \t1\t \t2 \t 3.004\t '), 3723004)
 
+    def test_str_to_ms_fast_path(self):
+        # The single-pass parser must accept exactly the same grammar
+        # as the generic one.
+        chars = ('1', '0', '.', ':', ',', '\N{RATIO}', '-', '\N{MINUS SIGN}',
+                 ' ', 'a')
+        for length in range(5):
+            for chars_tuple in itertools.product(chars, repeat=length):
+                time_str = ''.join(chars_tuple)
+                try:
+                    expected = time_tools._parse_time_str(
+                        time_str, time_tools.Precision.MS)
+                except ValueError:
+                    self.assertRaises(
+                        ValueError, time_tools.str_to_ms, time_str)
+                else:
+                    self.assertEqual(
+                        time_tools.str_to_ms(time_str), expected, time_str)
+
+    def test_precision(self):
+        precision = time_tools.Precision
+        to_str = time_tools.ms_to_str
+        to_ms = time_tools.str_to_ms
+
+        # Exact formatting of big values
+        self.assertEqual(
+            to_str(2 ** 53 * time_tools.HOUR_MS + 3599999),
+            '9007199254740992:59:59.999')
+
+        self.assertEqual(to_str(3723004005, False, precision.US),
+                         '01:02:03.004005')
+        self.assertEqual(to_str(-3723004005006, True, precision.NS),
+                         '\N{MINUS SIGN}01\N{RATIO}02\N{RATIO}03.004005006')
+
+        self.assertEqual(to_ms('01:02:03.004005', precision.US), 3723004005)
+        self.assertEqual(to_ms('-1.000000001', precision.NS), -1000000001)
+        self.assertEqual(to_ms('1:', precision.US), 60000000)
+        self.assertEqual(to_ms('.5', precision.NS), 500000000)
+
+        # Rounding half to even
+        self.assertEqual(to_ms('1.0005'), 1000)
+        self.assertEqual(to_ms('1.0015'), 1002)
+        self.assertEqual(to_ms('1.00150001'), 1002)
+        self.assertEqual(to_ms('1.0014999'), 1001)
+        self.assertEqual(to_ms('-1.0015'), -1002)
+        self.assertEqual(to_ms('1.0000025', precision.US), 1000002)
+
+        self.assertEqual(
+            time_tools.split_units(-3723004005, precision.US),
+            (-1, -2, -3, -4005))
+        self.assertEqual(
+            time_tools.join_units(1, 2, 3, 4005, precision.US), 3723004005)
+
+    def _check_many(self, many_func, func, *args):
+        inputs = [list(_MANY_VALUES), array('q', _MANY_VALUES)]
+        if numpy is not None:
+            inputs.append(numpy.array(_MANY_VALUES))
+
+        expected = [func(v, *args) for v in _MANY_VALUES]
+        for values in inputs:
+            self.assertEqual(many_func(values, *args), expected)
+        self.assertEqual(many_func([], *args), [])
+
+    def test_split_units_many(self):
+        self._check_many(time_tools.split_units_many, time_tools.split_units)
+
+    def test_ms_to_str_many(self):
+        self._check_many(time_tools.ms_to_str_many, time_tools.ms_to_str)
+        self._check_many(
+            time_tools.ms_to_str_many, time_tools.ms_to_str, True)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not available')
+    def test_ms_to_str_many_non_int64(self):
+        # Values that int64 can't hold exactly are not converted
+        for values in (
+                numpy.array([2 ** 64 - 1, 1], numpy.uint64),
+                numpy.array([1.5, -61001.25])):
+            self.assertEqual(
+                time_tools.ms_to_str_many(values),
+                [time_tools.ms_to_str(v) for v in values.tolist()])
+            self.assertEqual(
+                time_tools.split_units_many(values),
+                [time_tools.split_units(v) for v in values.tolist()])
+        self.assertEqual(
+            time_tools.ms_to_str_many(
+                numpy.array([2 ** 64 - 1], numpy.uint64)),
+            [time_tools.ms_to_str(2 ** 64 - 1)])
+
+    def test_str_to_ms_many(self):
+        to_ms_many = time_tools.str_to_ms_many
+
+        self.assertEqual(
+            to_ms_many(['01:02:03.004', '\N{MINUS SIGN}1', '', '1:']),
+            [3723004, -1000, 0, 60000])
+        self.assertEqual(to_ms_many([]), [])
+        self.assertRaises(ValueError, to_ms_many, ['1', 'abc'])
+
 
 if __name__ == '__main__':
     unittest.main()